@@ -0,0 +1,65 @@
+"""
+Saving benchmark results and comparing them against a saved baseline.
+
+Every benchmark here has the same flags (see add_arguments):
+
+    --save FILE       write this run's results as JSON
+    --baseline FILE   compare against a saved run; exit status 1 on a regression
+    --tolerance 0.2   how much worse (20%) a metric may get before it counts
+
+A benchmark lists the metrics it compares as (label, path into the results,
+noise floor). Higher is worse. A change only counts as a regression when it
+is over the tolerance and also bigger than the floor, so a metric that is
+tiny to begin with doesn't fail on noise.
+"""
+import json
+
+
+def add_arguments(parser):
+    parser.add_argument("--save", metavar="FILE", help="write the results as a baseline")
+    parser.add_argument("--baseline", metavar="FILE", help="compare against a saved baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="allowed slowdown vs the baseline before failing (0.2 = 20%%)")
+
+
+def load(path):
+    """The saved baseline at `path`, or None when no path was given."""
+    if not path:
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save(path, result):
+    if path:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+
+def lookup(result, path):
+    for key in path:
+        result = result.get(key) if isinstance(result, dict) else None
+    return result
+
+
+def compare(result, baseline, metrics, tolerance, same_keys=()):
+    """
+    Prints old vs new for `metrics` and returns the labels that regressed.
+    `same_keys` are options that should match for the numbers to be comparable.
+    """
+    differing = [key for key in same_keys if baseline.get(key) != result.get(key)]
+    if differing:
+        print(f"\n  note: the baseline was made with different {', '.join(differing)}")
+
+    print(f"\n  {'vs baseline':18} {'old':>10} {'new':>10} {'change':>8}")
+    regressed = []
+    for label, path, floor in metrics:
+        old, new = lookup(baseline, path), lookup(result, path)
+        if old is None or new is None:
+            continue
+        change = (new - old) / old if old else 0.0
+        worse = change > tolerance and new - old > floor
+        if worse:
+            regressed.append(label)
+        print(f"  {label:18} {old:10.1f} {new:10.1f} {change:+8.1%}{'  REGRESSED' if worse else ''}")
+    return regressed
@@ -0,0 +1,112 @@
+"""
+Startup benchmark for MiniGame.
+
+Starts the game N times, each in a fresh interpreter, with --startup-time:
+it draws the first frame, prints how long the imports, pygame setup and that
+frame took, and exits. Also timed from the outside, so interpreter startup is
+included too.
+
+    python benchmarks/bench_minigame_startup.py --runs 20
+    python benchmarks/bench_minigame_startup.py --runs 20 --cold   # no font cache
+
+--cold deletes the font cache (.cache/fonts.json) before every run, which
+shows what the system font scan costs on this machine. Runs use SDL's dummy
+video driver unless --window is given, so this works without a display.
+Baselines work as in bench_st1_load.py (--save / --baseline / --tolerance).
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import baselines
+from rerun_stats import percentile
+
+GAME = os.path.join(ROOT, "MiniGame")
+FONT_CACHE = os.path.join(ROOT, ".cache", "fonts.json")
+PHASES = ("imports", "init", "first_frame", "total", "process")
+
+# (label, path into the result, noise floor), see baselines.py
+COMPARED = [
+    ("total p50 ms", ("startup_ms", "total", "p50"), 10),
+    ("process p50 ms", ("startup_ms", "process", "p50"), 10),
+    ("first frame p50 ms", ("startup_ms", "first_frame", "p50"), 5),
+]
+
+
+def start_once(cold, window):
+    """One game start. Returns {phase: ms}."""
+    if cold:
+        try:
+            os.remove(FONT_CACHE)
+        except FileNotFoundError:
+            pass
+    env = dict(os.environ, PYGAME_HIDE_SUPPORT_PROMPT="1")
+    if not window:
+        env["SDL_VIDEODRIVER"] = "dummy"
+
+    began = time.perf_counter()
+    done = subprocess.run([sys.executable, GAME, "--startup-time", "--seed", "1"],
+                          capture_output=True, text=True, env=env, cwd=ROOT)
+    elapsed = time.perf_counter() - began
+    if done.returncode != 0:
+        raise RuntimeError(f"MiniGame failed:\n{done.stderr}")
+
+    line = next(line for line in done.stdout.splitlines() if line.startswith("startup_ms "))
+    phases = {name: float(value) for name, value in (item.split("=") for item in line.split()[1:])}
+    phases["process"] = elapsed * 1000
+    return phases
+
+
+def run_benchmark(runs, cold, window):
+    samples = [start_once(cold, window) for _ in range(runs)]
+    result = {"runs": runs, "cold": cold, "startup_ms": {}}
+    for phase in PHASES:
+        values = sorted(sample[phase] for sample in samples)
+        result["startup_ms"][phase] = {
+            "mean": sum(values) / len(values),
+            "p50": percentile(values, 50),
+            "p95": percentile(values, 95),
+            "max": values[-1],
+        }
+    return result
+
+
+def print_report(result):
+    print(f"MiniGame startup, {result['runs']} runs ({'no font cache' if result['cold'] else 'font cache'}):")
+    print(f"  {'phase':14} {'mean':>8} {'p50':>8} {'p95':>8} {'max':>8}  ms")
+    for phase, values in result["startup_ms"].items():
+        print(f"  {phase:14} {values['mean']:8.1f} {values['p50']:8.1f} {values['p95']:8.1f} {values['max']:8.1f}")
+    print("  (process = the whole run seen from outside, interpreter startup included)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="MiniGame startup benchmark")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--cold", action="store_true", help="delete the font cache before every run")
+    parser.add_argument("--window", action="store_true", help="open a real window instead of SDL's dummy driver")
+    baselines.add_arguments(parser)
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args(argv)
+
+    baseline = baselines.load(args.baseline)
+    result = run_benchmark(args.runs, args.cold, args.window)
+
+    if args.json:
+        json.dump(result, sys.stdout, indent=2)
+        print()
+    else:
+        print_report(result)
+    baselines.save(args.save, result)
+    if baseline is not None and baselines.compare(result, baseline, COMPARED, args.tolerance,
+                                                  same_keys=("cold",)):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+"""
+Load benchmark for st1.py.
+
+Runs N sessions at once, each playing whole games (start -> crossroads -> ...
+-> victory or game over, then "Try Again") through Streamlit's AppTest
+harness. Choices come from simulate.py's policies, so the paths and the
+deaths look like real players.
+
+AppTest swaps a process-wide mock runtime in and out around every run, so two
+sessions can't share a process. Each session gets its own, and warms it up
+with one game first so its caches are as full as a long-running server's.
+They all start playing at the same moment and compete for the CPU.
+
+Reported per rerun (one click or answer, including any st.rerun() it causes):
+
+    latency  wall time, p50/p95/p99/max, overall and per scene
+    bytes    size of the ForwardMsgs the browser would get
+    memory   peak RSS per session process, and how much playing added to it
+
+Save a run as a baseline and compare later runs against it:
+
+    python benchmarks/bench_st1_load.py --sessions 8 --games 3 --save baseline.json
+    python benchmarks/bench_st1_load.py --sessions 8 --games 3 --baseline baseline.json
+
+With --baseline the exit status is 1 if a metric got worse by more than
+--tolerance, so it can gate a deploy. Compare runs made with the same
+options on the same machine.
+
+Winning the ball court includes st1.py's 2 second celebration sleep, so the
+"ballgame" row is slow on purpose.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# The benchmark signs ball court codes itself, so it needs to know the secret
+os.environ.setdefault("XIBALBA_WIN_SECRET", "bench-secret")
+
+from streamlit import logger as st_logger
+from streamlit.testing.v1 import AppTest
+from streamlit.testing.v1.local_script_runner import LocalScriptRunner
+
+import baselines
+from rerun_stats import percentile
+from scene_graph import load_scene_graph
+from simulate import make_policy
+from win_codes import WinCodes
+
+try:
+    import resource
+except ImportError:   # Windows
+    resource = None
+
+APP = os.path.join(ROOT, "st1.py")
+RUN_TIMEOUT = 30   # seconds; a ball court win sleeps for 2
+
+
+#####################
+# Measuring
+#####################
+#
+# AppTest doesn't expose the messages a run produced, so the runner's
+# forward_msgs() (called once at the end of every run) is wrapped to total
+# their size for the calling thread. The runner's event log covers every
+# script run in the rerun, including ones restarted by st.rerun().
+
+_last_run = threading.local()
+_forward_msgs = LocalScriptRunner.forward_msgs
+
+
+def _counting_forward_msgs(runner):
+    _last_run.bytes = sum(
+        data["forward_msg"].ByteSize() for data in runner.event_data if "forward_msg" in data
+    )
+    return _forward_msgs(runner)
+
+
+LocalScriptRunner.forward_msgs = _counting_forward_msgs
+
+
+def rss_mb():
+    """Current resident memory in MB (None where it can't be read)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 1024   # bytes on macOS, KB elsewhere
+
+
+#####################
+# Playing
+#####################
+
+class Session:
+    """One simulated player: an AppTest plus the timings of its reruns."""
+
+    def __init__(self, graph, policy, seed, codes):
+        self.graph = graph
+        self.policy = policy
+        self.rng = random.Random(seed)
+        self.codes = codes
+        self.at = AppTest.from_file(APP, default_timeout=RUN_TIMEOUT)
+        self.samples = []          # (scene id, seconds, bytes)
+        self.endings = Counter()
+
+    def rerun(self, scene_id, action):
+        """Times one interaction. `action` sets up widgets and returns the thing to run."""
+        _last_run.bytes = 0
+        started = time.perf_counter()
+        action().run()
+        elapsed = time.perf_counter() - started
+        if self.at.exception:
+            raise RuntimeError(f"{scene_id}: {self.at.exception[0].message}")
+        self.samples.append((scene_id, elapsed, _last_run.bytes))
+
+    def button(self, label):
+        for button in self.at.button:
+            if button.label == label:
+                return button.click()
+        raise RuntimeError(f"no button '{label}' on {self.at.session_state.scene}")
+
+    def choose(self, scene):
+        """Performs the player's move in `scene`."""
+        at = self.at
+        if scene.kind == "intro":
+            self.rerun(scene.id, lambda: self.button(scene.choices[0].label))
+        elif scene.kind == "choice":
+            key = self.policy(scene, tuple(scene.options), self.rng)
+            at.radio[0].set_value(scene.options[key])
+            self.rerun(scene.id, lambda: self.button(scene.button))
+        elif scene.kind == "ballgame":
+            # Play the match the way simulate.py does, then type in the code
+            shots = tuple(scene.shot_options)
+            score = sum(scene.shot_for_key[self.policy(scene, shots, self.rng)].scores
+                        for _ in range(scene.rounds))
+            side = "P1" if score >= scene.min_score else "P2"
+            at.text_input[0].input(self.codes.sign(at.session_state.win_nonce, side))
+            self.rerun(scene.id, lambda: self.button("Verify Sacred Code"))
+        else:
+            # Victory / game over: start the next game
+            self.rerun(scene.id, lambda: self.button(scene.choices[0].label))
+
+    def play(self, games):
+        self.rerun("(load)", lambda: self.at)
+        for _ in range(games):
+            while True:
+                scene = self.graph[self.at.session_state.scene]
+                if scene.kind in ("ending", "game_over"):
+                    self.endings[scene.id] += 1
+                    self.choose(scene)
+                    break
+                self.choose(scene)
+        return self
+
+
+_start_line = None
+
+
+def _init_worker(barrier):
+    global _start_line
+    _start_line = barrier
+
+
+def run_session(job):
+    """One session in its own process: warm up, wait for the others, play."""
+    index, games, policy_name, seed = job
+    os.chdir(ROOT)   # st1.py finds its media relative to the working directory
+    graph = load_scene_graph()
+    codes = WinCodes(os.environ["XIBALBA_WIN_SECRET"].encode("utf-8"))
+
+    # A game along the winning path visits every scene and loads the caches
+    try:
+        warm_up = Session(graph, make_policy("dev"), seed, codes)
+        warm_up.rerun("(load)", lambda: warm_up.at)
+        # Streamlit sets its log level when the first run reads the config;
+        # keep every session's deprecation warnings out of the report
+        st_logger.set_log_level("error")
+        warm_up.play(1)
+    except BaseException:
+        _start_line.abort()   # don't leave the others waiting
+        raise
+    warm_rss = rss_mb()
+
+    _start_line.wait()
+    player = Session(graph, make_policy(policy_name), seed + index, codes).play(games)
+    return {
+        "samples": player.samples,
+        "endings": player.endings,
+        "warm_rss": warm_rss,
+        "peak_rss": peak_rss_mb(),
+    }
+
+
+def run_benchmark(sessions, games, policy_name, seed):
+    # spawn: every session starts from a clean interpreter, so RSS is its own
+    ctx = multiprocessing.get_context("spawn")
+    barrier = ctx.Barrier(sessions + 1)
+    jobs = [(index, games, policy_name, seed) for index in range(sessions)]
+
+    with ctx.Pool(sessions, initializer=_init_worker, initargs=(barrier,)) as pool:
+        pending = pool.map_async(run_session, jobs)
+        try:
+            barrier.wait()
+        except threading.BrokenBarrierError:
+            pending.get()   # raises the session's error
+            raise
+        began = time.perf_counter()
+        results = pending.get()
+        wall = time.perf_counter() - began
+
+    samples = [sample for result in results for sample in result["samples"]]
+    endings = sum((result["endings"] for result in results), Counter())
+    peaks = [result["peak_rss"] for result in results if result["peak_rss"] is not None]
+    growth = [result["peak_rss"] - result["warm_rss"] for result in results
+              if result["peak_rss"] is not None and result["warm_rss"] is not None]
+    return summarize(samples, {
+        "sessions": sessions,
+        "games": games,
+        "policy": policy_name,
+        "wall_s": wall,
+        "endings": dict(endings),
+        "rss_mb": {
+            "warm": sum(r["warm_rss"] for r in results) / sessions if all(r["warm_rss"] for r in results) else None,
+            "peak": max(peaks) if peaks else None,
+            "growth": max(growth) if growth else None,
+        },
+    })
+
+
+#####################
+# Report
+#####################
+
+def stats(values):
+    values = sorted(values)
+    return {
+        "count": len(values),
+        "mean": sum(values) / len(values),
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": values[-1],
+    }
+
+
+def summarize(samples, result):
+    by_scene = defaultdict(list)
+    for scene_id, seconds, size in samples:
+        by_scene[scene_id].append((seconds, size))
+    by_scene["all"] = [(seconds, size) for _, seconds, size in samples]
+
+    result["reruns"] = len(samples)
+    result["latency_ms"] = {scene: stats([s * 1000 for s, _ in rows]) for scene, rows in by_scene.items()}
+    result["bytes"] = {scene: stats([b for _, b in rows]) for scene, rows in by_scene.items()}
+    return result
+
+
+def print_report(result):
+    print(f"{result['sessions']} sessions x {result['games']} games ({result['policy']}): "
+          f"{result['reruns']} reruns in {result['wall_s']:.1f}s")
+    print(f"  endings: {', '.join(f'{k} {v}' for k, v in sorted(result['endings'].items()))}")
+    print()
+    print(f"  {'scene':18} {'reruns':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8} ms {'KB/rerun':>9}")
+    for scene, latency in result["latency_ms"].items():
+        size = result["bytes"][scene]
+        print(f"  {scene:18} {latency['count']:6} {latency['p50']:8.1f} {latency['p95']:8.1f} "
+              f"{latency['p99']:8.1f} {latency['max']:8.1f}    {size['mean'] / 1024:9.1f}")
+
+    rss = result["rss_mb"]
+    if rss["peak"] is not None:
+        print(f"\n  peak RSS per session {rss['peak']:.1f} MB", end="")
+        if rss["growth"] is not None:
+            print(f" ({rss['warm']:.1f} MB after warm-up, playing added up to {rss['growth']:.2f} MB)", end="")
+        print()
+
+
+# (label, path into the result, noise floor), see baselines.py
+COMPARED = [
+    ("latency p50 ms", ("latency_ms", "all", "p50"), 5),
+    ("latency p95 ms", ("latency_ms", "all", "p95"), 5),
+    ("latency p99 ms", ("latency_ms", "all", "p99"), 5),
+    ("bytes/rerun", ("bytes", "all", "mean"), 256),
+    ("peak RSS MB", ("rss_mb", "peak"), 5),
+    ("RSS growth MB", ("rss_mb", "growth"), 5),
+]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent-session load benchmark for st1.py")
+    parser.add_argument("--sessions", type=int, default=8,
+                        help="players at the same time (one process each)")
+    parser.add_argument("--games", type=int, default=2, help="games each player plays")
+    parser.add_argument("--policy", default="skill:0.8",
+                        help="how players choose (see simulate.py): random, dev or skill:<0..1>")
+    parser.add_argument("--seed", type=int, default=1)
+    baselines.add_arguments(parser)
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args(argv)
+
+    try:
+        make_policy(args.policy)
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    baseline = baselines.load(args.baseline)
+
+    result = run_benchmark(args.sessions, args.games, args.policy, args.seed)
+
+    if args.json:
+        json.dump(result, sys.stdout, indent=2)
+        print()
+    else:
+        print_report(result)
+    baselines.save(args.save, result)
+    if baseline is not None and baselines.compare(result, baseline, COMPARED, args.tolerance,
+                                                  same_keys=("sessions", "games", "policy")):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Collision detection for the ball game.
+
+Bodies (balls, paddles, hoops, obstacles) live in a uniform grid over the
+court. Finding what a body touches only looks at the grid cells under it
+(the broadphase), then runs the exact shape test on those few candidates
+(the narrowphase). So the cost of a check depends on how crowded that part of
+the court is, not on how many things are on it.
+
+Static bodies (hoops, walls) go into the grid once. Moving bodies are
+re-filed with `update()` after they move, which is a no-op while they stay in
+the same cells.
+
+Rects are anything with x, y, w, h (pygame.Rect works, and is what MiniGame
+uses). Overlap follows pygame's colliderect: touching edges don't count.
+"""
+from operator import attrgetter
+
+
+#####################
+# Narrowphase
+#####################
+#
+# Shape tests, looked up by the pair of shape names. A "circle" body's circle
+# is the one inscribed in its rect.
+
+def aabb_vs_aabb(a, b):
+    return a.x < b.x + b.w and b.x < a.x + a.w and a.y < b.y + b.h and b.y < a.y + a.h
+
+
+def circle_vs_circle(a, b):
+    ra, rb = a.w / 2, b.w / 2
+    dx = (a.x + ra) - (b.x + rb)
+    dy = (a.y + ra) - (b.y + rb)
+    return dx * dx + dy * dy < (ra + rb) ** 2
+
+
+def aabb_vs_circle(box, circle):
+    r = circle.w / 2
+    cx, cy = circle.x + r, circle.y + r
+    nearest_x = min(max(cx, box.x), box.x + box.w)
+    nearest_y = min(max(cy, box.y), box.y + box.h)
+    dx, dy = cx - nearest_x, cy - nearest_y
+    return dx * dx + dy * dy < r * r
+
+
+NARROWPHASE = {
+    ("aabb", "aabb"): aabb_vs_aabb,
+    ("circle", "circle"): circle_vs_circle,
+    ("aabb", "circle"): aabb_vs_circle,
+    ("circle", "aabb"): lambda a, b: aabb_vs_circle(b, a),
+}
+
+
+def overlaps(a, b):
+    """Exact test between two bodies, by their shapes."""
+    return NARROWPHASE[a.shape, b.shape](a.rect, b.rect)
+
+
+#####################
+# Broadphase
+#####################
+
+class Body:
+    """Something on the court. `data` is free for the game (e.g. which side a hoop scores for)."""
+
+    __slots__ = ("order", "kind", "rect", "shape", "static", "data", "cells")
+
+    def __init__(self, kind, rect, shape="aabb", static=False, data=None):
+        self.order = 0
+        self.kind = kind
+        self.rect = rect
+        self.shape = shape
+        self.static = static
+        self.data = data
+        self.cells = ()
+
+    def __repr__(self):
+        return f"Body({self.kind!r}, {self.rect!r})"
+
+
+class CollisionWorld:
+    """Uniform grid of `cell_size` pixel cells over a width x height court."""
+
+    def __init__(self, width, height, cell_size=64):
+        self.width = width
+        self.height = height
+        self.cell_size = cell_size
+        self.last_col = (width - 1) // cell_size
+        self.last_row = (height - 1) // cell_size
+        self.grid = {}       # (col, row) -> list of bodies
+        self.bodies = []
+
+    def cells_for(self, rect):
+        size = self.cell_size
+        last_col, last_row = self.last_col, self.last_row
+        # Clamp every edge to the court, so bodies partly or even fully
+        # off-screen still land in the edge cells
+        left = min(max(0, int(rect.x // size)), last_col)
+        top = min(max(0, int(rect.y // size)), last_row)
+        right = min(max(0, int((rect.x + rect.w) // size)), last_col)
+        bottom = min(max(0, int((rect.y + rect.h) // size)), last_row)
+        if left == right and top == bottom:
+            return ((left, top),)
+        return tuple((col, row) for col in range(left, right + 1) for row in range(top, bottom + 1))
+
+    def add(self, body):
+        body.order = len(self.bodies)
+        self.bodies.append(body)
+        self._file(body, self.cells_for(body.rect))
+        return body
+
+    def remove(self, body):
+        self._unfile(body)
+        self.bodies.remove(body)
+
+    def update(self, body):
+        """Re-files a moving body after its rect changed."""
+        cells = self.cells_for(body.rect)
+        if cells != body.cells:
+            self._unfile(body)
+            self._file(body, cells)
+
+    def _file(self, body, cells):
+        for cell in cells:
+            self.grid.setdefault(cell, []).append(body)
+        body.cells = cells
+
+    def _unfile(self, body):
+        for cell in body.cells:
+            bucket = self.grid[cell]
+            bucket.remove(body)
+            if not bucket:
+                del self.grid[cell]
+        body.cells = ()
+
+    def candidates(self, body, kind=None):
+        """Bodies sharing a grid cell with `body` (broadphase only), in the order they were added."""
+        found = {}   # a dict, to drop bodies seen in more than one cell
+        grid = self.grid
+        for cell in body.cells or self.cells_for(body.rect):
+            for other in grid.get(cell, ()):
+                if other is not body and (kind is None or other.kind == kind):
+                    found[other] = None
+        found = list(found)
+        if len(found) > 1:
+            found.sort(key=attrgetter("order"))
+        return found
+
+    def touching(self, body, kind=None):
+        """Bodies (optionally of one kind) that `body` overlaps, in the order they were added."""
+        return [other for other in self.candidates(body, kind) if overlaps(body, other)]
@@ -0,0 +1,94 @@
+"""
+Font loading for MiniGame without the system font scan.
+
+pygame.font.SysFont() has to find a font file first, and the first lookup in
+a process scans every system font (fc-list on Linux, the registry on
+Windows), which takes hundreds of milliseconds on machines with many fonts.
+The answer almost never changes, so FontBook remembers which file SysFont
+picked (and whether it had to fake bold / italic) in a small JSON file, and
+later runs load that file directly. Entries whose file has gone missing are
+looked up again.
+
+Fonts are lazy too: FontBook.lazy() hands out a stand-in that loads the font
+the first time something is drawn with it.
+
+    fonts = FontBook(".cache/fonts.json")
+    TITLE = fonts.lazy("serif", 42, bold=True)
+    TITLE.render("3", True, (255, 255, 255))   # loads the font here
+"""
+import json
+import os
+import threading
+
+import pygame
+from pygame.sysfont import font_constructor
+
+
+class FontBook:
+    """Resolved system font paths, cached on disk between runs."""
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = self._read()   # "name|bold|italic" -> [path or None, fake bold, fake italic]
+
+    def _read(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return entries if isinstance(entries, dict) else {}
+
+    def _write(self):
+        # A read-only checkout just means no cache, not a crash
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.entries, f, indent=1)
+            os.replace(tmp, self.path)
+        except OSError:
+            pass
+
+    def resolve(self, name, bold=False, italic=False):
+        """
+        (font file or None for pygame's built-in font, fake bold, fake italic),
+        the same choice SysFont makes.
+        """
+        key = f"{name}|{int(bold)}|{int(italic)}"
+        entry = self.entries.get(key)
+        if entry and (entry[0] is None or os.path.exists(entry[0])):
+            return tuple(entry)
+
+        # Let SysFont do the search, and keep what it would have loaded
+        found = []
+        pygame.font.SysFont(name, 1, bold, italic,
+                            constructor=lambda path, size, fake_bold, fake_italic:
+                                found.append([path, fake_bold, fake_italic]))
+        self.entries[key] = found[0]
+        self._write()
+        return tuple(found[0])
+
+    def load(self, name, size, bold=False, italic=False):
+        """A pygame Font, like pygame.font.SysFont(name, size, bold, italic)."""
+        path, fake_bold, fake_italic = self.resolve(name, bold, italic)
+        return font_constructor(path, size, fake_bold, fake_italic)
+
+    def lazy(self, name, size, bold=False, italic=False):
+        return LazyFont(self, name, size, bold, italic)
+
+
+class LazyFont:
+    """Stands in for a pygame Font and loads it on first use."""
+
+    __slots__ = ("book", "spec", "font")
+
+    def __init__(self, book, *spec):
+        self.book = book
+        self.spec = spec
+        self.font = None
+
+    def __getattr__(self, attr):
+        if self.font is None:
+            self.font = self.book.load(*self.spec)
+        return getattr(self.font, attr)
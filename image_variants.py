@@ -0,0 +1,116 @@
+"""
+Resized, recompressed copies of the scene art.
+
+The PNGs in the scene folders are several hundred KB each, but st1.py shows
+them in a 1/3-width column. This module builds smaller WebP variants at a few
+widths and keeps them in an on-disk cache keyed by the source file's content
+hash, so the work is done once per image (not once per rerun or per process).
+
+Pillow is optional. Without it, callers just get the original file back.
+
+Build everything ahead of time with:
+
+    python image_variants.py
+"""
+import hashlib
+import os
+import sys
+import threading
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow not installed: serve the originals
+    Image = None
+
+# Widths (in pixels) that variants are built at
+VARIANT_WIDTHS = (320, 480, 640, 960)
+VARIANT_DIR = os.path.join(".cache", "scene_images")
+WEBP_QUALITY = 82
+
+
+def content_hash(path):
+    """sha1 of the file contents, used as the cache key."""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def variant_path(digest, width, variant_dir=VARIANT_DIR):
+    return os.path.join(variant_dir, f"{digest[:16]}-{width}w.webp")
+
+
+def build_variants(path, widths=VARIANT_WIDTHS, variant_dir=VARIANT_DIR, digest=None):
+    """
+    Builds every missing variant of an image and returns {width: path}.
+
+    Widths at or above the original width are skipped, since upscaling would
+    only make the file bigger. Returns {} when Pillow is not available.
+    """
+    if Image is None:
+        return {}
+    if digest is None:
+        digest = content_hash(path)
+
+    variants = {}
+    source = None
+    try:
+        for width in sorted(widths):
+            target = variant_path(digest, width, variant_dir)
+            if os.path.exists(target):
+                variants[width] = target
+                continue
+
+            if source is None:
+                source = Image.open(path)
+                source.load()
+                if source.mode not in ("RGB", "RGBA"):
+                    source = source.convert("RGBA")
+            if width >= source.width:
+                break
+
+            height = max(1, round(source.height * width / source.width))
+            resized = source.resize((width, height), Image.LANCZOS)
+
+            os.makedirs(variant_dir, exist_ok=True)
+            tmp = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+            resized.save(tmp, "WEBP", quality=WEBP_QUALITY)
+            os.replace(tmp, target)
+            variants[width] = target
+    finally:
+        if source is not None:
+            source.close()
+    return variants
+
+
+def pick_variant(variants, display_width):
+    """
+    Smallest variant at least `display_width` pixels wide, or None when the
+    original is the best fit.
+    """
+    for width in sorted(variants):
+        if width >= display_width:
+            return variants[width]
+    return None
+
+
+def main(root="."):
+    """Prebuilds variants for every image in the scene folders."""
+    from media_cache import AssetCache
+
+    cache = AssetCache(root=root)
+    cache.index_all()
+    for entry in sorted(os.listdir(root)):
+        for media in cache.scene_files(entry):
+            if media.kind != "image":
+                continue
+            variants = build_variants(media.path)
+            sizes = ", ".join(f"{w}w={os.path.getsize(p) // 1024}KB" for w, p in sorted(variants.items()))
+            print(f"{media.path} ({media.size // 1024}KB): {sizes or 'kept original'}")
+
+
+if __name__ == "__main__":
+    if Image is None:
+        sys.exit("Pillow is not installed (pip install pillow).")
+    main()
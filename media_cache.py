@@ -0,0 +1,327 @@
+"""
+Process-wide cache for the scene media folders.
+
+Streamlit reruns st1.py from the top on every click, so anything kept at module
+level in st1.py is rebuilt each time. st1.py keeps one AssetCache per process
+(through st.cache_resource), so every session shares the same folder index and
+the same encoded audio payloads.
+
+Audio can also be published into Streamlit's static folder under a
+content-hashed name (see publish_static), so the page only carries a URL and
+the browser can cache the file.
+
+A Prefetcher does all that for the scenes a player can go to next on a small
+thread pool, so the transition doesn't wait on the disk or on Pillow.
+"""
+import base64
+import hashlib
+import os
+import shutil
+import stat
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import image_variants
+
+IMAGE_EXTS = ('.png', '.jpg', '.jpeg', '.gif')
+VIDEO_EXTS = ('.mp4', '.mov', '.webm')
+AUDIO_EXTS = ('.mp3', '.wav', '.ogg')
+
+MIME_TYPES = {
+    'png': 'image/png', 'jpg': 'image/jpeg', 'jpeg': 'image/jpeg', 'gif': 'image/gif',
+    'mp4': 'video/mp4', 'mov': 'video/quicktime', 'webm': 'video/webm',
+    'mp3': 'audio/mpeg', 'wav': 'audio/wav', 'ogg': 'audio/ogg',
+}
+
+
+def media_kind(file_name):
+    """Returns 'image', 'video', 'audio' or None for a file name."""
+    lower = file_name.lower()
+    if lower.endswith(IMAGE_EXTS):
+        return "image"
+    if lower.endswith(VIDEO_EXTS):
+        return "video"
+    if lower.endswith(AUDIO_EXTS):
+        return "audio"
+    return None
+
+
+def publish_file(path, root=".", static_dir="static", subdir="media", prefix=""):
+    """
+    Copies `path` into Streamlit's static folder as
+    <static_dir>/<subdir>/<prefix><content hash>.<ext> and returns
+    (content hash, URL). The name changes whenever the content does, so the
+    browser never has to revalidate it, and the static server takes care of
+    Range requests and ETags.
+
+    Always a copy, never a hard link: a link would share the source's inode,
+    so editing the source in place would change the content behind every
+    hash it was ever published under.
+    """
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    content_hash = digest.hexdigest()[:16]
+    ext = path.rsplit('.', 1)[-1].lower()
+    public_name = f"{prefix}{content_hash}.{ext}"
+
+    target_dir = os.path.join(root, static_dir, subdir)
+    target = os.path.join(target_dir, public_name)
+    if not os.path.exists(target):
+        os.makedirs(target_dir, exist_ok=True)
+        tmp = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+        shutil.copyfile(path, tmp)
+        os.replace(tmp, target)
+
+    return content_hash, f"app/{static_dir}/{subdir}/{public_name}"
+
+
+class MediaFile:
+    """One renderable file inside a scene folder."""
+    __slots__ = ("path", "name", "kind", "mime", "mtime", "size")
+
+    def __init__(self, path, name, kind, mime, mtime, size):
+        self.path = path
+        self.name = name
+        self.kind = kind
+        self.mime = mime
+        self.mtime = mtime
+        self.size = size
+
+
+class AssetCache:
+    """
+    Indexes the scene folders once and keeps base64 payloads in memory.
+
+    - Folder listings are re-checked at most every `check_interval` seconds,
+      and a folder is only re-listed when its mtime or a file's mtime changed.
+    - Encoded payloads are kept in LRU order and evicted once their total
+      size goes over `max_bytes`.
+    """
+
+    def __init__(self, root=".", max_bytes=64 * 1024 * 1024, check_interval=1.0):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.check_interval = check_interval
+
+        self._lock = threading.Lock()
+        # scene -> {"dir_mtime", "checked_at", "files"}
+        self._index = {}
+        # path -> (mtime, size, encoded)
+        self._payloads = OrderedDict()
+        self._payload_bytes = 0
+        # path -> (mtime, size, url)
+        self._published = {}
+        # path -> (mtime, size, {width: variant path})
+        self._variants = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    #####################
+    # Folder index
+    #####################
+
+    def index_all(self):
+        """Indexes every folder under root that holds at least one media file."""
+        for entry in sorted(os.listdir(self.root)):
+            if os.path.isdir(os.path.join(self.root, entry)) and not entry.startswith('.'):
+                self.scene_files(entry)
+
+    def scene_files(self, scene_name):
+        """Returns the sorted list of MediaFile objects for a scene folder."""
+        now = time.monotonic()
+        with self._lock:
+            cached = self._index.get(scene_name)
+            if cached and now - cached["checked_at"] < self.check_interval:
+                return cached["files"]
+
+        folder = os.path.join(self.root, scene_name)
+        try:
+            dir_stat = os.stat(folder)
+        except OSError:
+            dir_stat = None
+        if dir_stat is None or not stat.S_ISDIR(dir_stat.st_mode):
+            with self._lock:
+                self._index[scene_name] = {"dir_mtime": None, "checked_at": now, "files": []}
+            return []
+        dir_mtime = dir_stat.st_mtime
+
+        if cached and cached["dir_mtime"] == dir_mtime and self._files_unchanged(cached["files"]):
+            with self._lock:
+                cached["checked_at"] = now
+            return cached["files"]
+
+        files = self._scan(folder)
+        with self._lock:
+            self._index[scene_name] = {"dir_mtime": dir_mtime, "checked_at": now, "files": files}
+        return files
+
+    def known_files(self, scene_name):
+        """The scene's files as last indexed, without touching the disk (empty if never indexed)."""
+        with self._lock:
+            cached = self._index.get(scene_name)
+        return cached["files"] if cached else []
+
+    def _files_unchanged(self, files):
+        for media in files:
+            try:
+                file_stat = os.stat(media.path)
+            except OSError:
+                return False
+            if file_stat.st_mtime != media.mtime or file_stat.st_size != media.size:
+                return False
+        return True
+
+    def _scan(self, folder):
+        files = []
+        for name in sorted(os.listdir(folder)):
+            kind = media_kind(name)
+            if kind is None:
+                continue
+            path = os.path.join(folder, name)
+            try:
+                file_stat = os.stat(path)
+            except OSError:
+                continue
+            mime = MIME_TYPES.get(name.lower().rsplit('.', 1)[-1], 'application/octet-stream')
+            files.append(MediaFile(path, name, kind, mime, file_stat.st_mtime, file_stat.st_size))
+        return files
+
+    #####################
+    # Payloads
+    #####################
+
+    def base64_payload(self, media):
+        """Returns the base64 text for a MediaFile, reading the disk only on a miss."""
+        with self._lock:
+            cached = self._payloads.get(media.path)
+            if cached and cached[0] == media.mtime and cached[1] == media.size:
+                self._payloads.move_to_end(media.path)
+                self.hits += 1
+                return cached[2]
+
+        with open(media.path, 'rb') as f:
+            encoded = base64.b64encode(f.read()).decode()
+
+        with self._lock:
+            self.misses += 1
+            old = self._payloads.pop(media.path, None)
+            if old:
+                self._payload_bytes -= len(old[2])
+            # Anything bigger than the whole budget is served but never kept
+            if len(encoded) <= self.max_bytes:
+                self._payloads[media.path] = (media.mtime, media.size, encoded)
+                self._payload_bytes += len(encoded)
+                while self._payload_bytes > self.max_bytes:
+                    _, evicted = self._payloads.popitem(last=False)
+                    self._payload_bytes -= len(evicted[2])
+                    self.evictions += 1
+        return encoded
+
+    #####################
+    # Image variants
+    #####################
+
+    def image_path(self, media, display_width):
+        """
+        Path of the smallest prebuilt variant that still covers
+        `display_width` pixels, building the variants on first use.
+        Falls back to the original file.
+        """
+        with self._lock:
+            cached = self._variants.get(media.path)
+        if not cached or cached[0] != media.mtime or cached[1] != media.size:
+            try:
+                variants = image_variants.build_variants(media.path)
+            except OSError:
+                variants = {}
+            cached = (media.mtime, media.size, variants)
+            with self._lock:
+                self._variants[media.path] = cached
+        return image_variants.pick_variant(cached[2], display_width) or media.path
+
+    #####################
+    # Static publishing
+    #####################
+
+    def publish_static(self, media, static_dir="static", subdir="media"):
+        """
+        Makes a MediaFile reachable through Streamlit's static file server and
+        returns its URL (see publish_file). Remembered until the file changes.
+        """
+        url = self.published_url(media)
+        if url is not None:
+            return url
+
+        _, url = publish_file(media.path, self.root, static_dir, subdir)
+        with self._lock:
+            self._published[media.path] = (media.mtime, media.size, url)
+        return url
+
+    def published_url(self, media):
+        """The URL publish_static gave `media`, or None if it hasn't yet (or the file changed since)."""
+        with self._lock:
+            cached = self._published.get(media.path)
+        if cached and cached[0] == media.mtime and cached[1] == media.size:
+            return cached[2]
+        return None
+
+    #####################
+    # Warming
+    #####################
+
+    def warm_scene(self, scene_name, display_width, audio_url=True):
+        """
+        Does the slow part of showing a scene ahead of time: lists the folder,
+        builds the image variants and publishes (or encodes) the audio.
+        """
+        files = self.scene_files(scene_name)
+        for media in files:
+            if media.kind == "audio":
+                if audio_url:
+                    self.publish_static(media)
+                else:
+                    self.base64_payload(media)
+            elif media.kind == "image":
+                self.image_path(media, display_width)
+        return files
+
+    def stats(self):
+        with self._lock:
+            return {
+                "scenes": len(self._index),
+                "payloads": len(self._payloads),
+                "payload_bytes": self._payload_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+class Prefetcher:
+    """
+    Warms an AssetCache for upcoming scenes on background threads. Each scene
+    is warmed once per set of options (again only if that failed); after
+    that the cache itself notices changed files.
+    """
+
+    def __init__(self, cache, workers=2):
+        self.cache = cache
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="media-prefetch")
+        self._lock = threading.Lock()
+        self._jobs = {}   # (scene, display width, audio_url) -> Future
+
+    def prefetch(self, scene_names, display_width, audio_url=True):
+        """Queues the scenes that aren't warm yet. Never blocks."""
+        for scene_name in scene_names:
+            key = (scene_name, display_width, audio_url)
+            with self._lock:
+                job = self._jobs.get(key)
+                if job is not None and not (job.done() and job.exception()):
+                    continue
+                self._jobs[key] = self.pool.submit(self.cache.warm_scene, *key)
@@ -0,0 +1,42 @@
+"""
+Pok-A-Tok rules and tuning shared by MiniGame (the pygame version) and
+minigame_sim.py (headless matches for tuning the AI). Change a number here and
+both pick it up.
+
+Speeds are in pixels per physics tick; the game steps physics at PHYSICS_HZ.
+"""
+
+# Court
+WIDTH, HEIGHT = 900, 500
+
+# Paddles and ball
+PADDLE_W, PADDLE_H = 18, 120
+PADDLE_MARGIN = 40          # gap between each paddle and its wall
+BALL_SIZE = 18
+PADDLE_SPEED = 6
+BALL_SPEED = 6
+
+# Right paddle AI: how fast it moves and how far off its aim can be
+AI_SPEED = 5
+REACTION_ERROR = 15
+
+# Height (z) of the ball
+GRAVITY = 0.4
+HIT_BOUNCE = 11
+FLOOR_BOUNCE = 0.6          # fraction of vertical speed kept on a floor bounce
+
+# Hoops: the ball gets pulled towards a hoop it rolls over, and scores once it
+# is within SCORE_DISTANCE of the center
+HOOP_RADIUS = 25
+HOOP_THICKNESS = 5
+HOOP_CENTER_TOP = (WIDTH//2, 60)
+HOOP_CENTER_BOTTOM = (WIDTH//2, HEIGHT - 60)
+PULL_STRENGTH = 0.05
+SCORE_DISTANCE = 5
+
+# Timing
+PHYSICS_HZ = 60
+DT = 1.0 / PHYSICS_HZ
+SCORE_COUNTDOWN = 3         # seconds the ball sits in the hoop after a score
+PENALTY_DURATION = 1.0      # seconds the "PENALTY!" banner stays up
+SERVE_ANGLE = 0.7           # serves go out at up to +/- this * BALL_SPEED vertically
@@ -0,0 +1,163 @@
+"""
+Frame profiler for MiniGame.
+
+Every frame records how long each phase took (input, physics and its parts,
+each draw step, pushing to the screen), plus counters such as live particles
+and how many memory blocks Python allocated. Garbage collector pauses are
+timed too, since they are a classic source of jank.
+
+Recent frames feed the on-screen overlay (F3 in the game). With
+`--profile FILE` every frame is kept and written out on quit, as CSV or JSON
+depending on the extension, along with p50/p99 times.
+
+Phases nest freely (e.g. "hoop_pull" inside "physics"); each one is timed on
+its own, so nested times are also counted in their parent.
+"""
+import csv
+import gc
+import json
+import sys
+import time
+from collections import deque
+
+import numpy as np
+
+perf_counter = time.perf_counter
+
+
+class _Phase:
+    """Context manager that adds its elapsed time to one phase of the current frame."""
+
+    __slots__ = ("profiler", "name", "started")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.started = 0.0
+
+    def __enter__(self):
+        self.started = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        frame = self.profiler.frame
+        frame[self.name] = frame.get(self.name, 0.0) + perf_counter() - self.started
+
+
+class FrameProfiler:
+    """Collects one dict of phase times and counters per frame."""
+
+    def __init__(self, history=240, keep_trace=False):
+        self.history = deque(maxlen=history)   # recent frames, for the overlay
+        self.trace = [] if keep_trace else None
+        self.phases = {}                       # name -> _Phase, in first-seen order
+        self.frame = {}
+        self.frame_index = 0
+        self._frame_started = None
+        self._blocks = sys.getallocatedblocks()
+        self._gc_started = None
+        gc.callbacks.append(self._on_gc)
+
+    def phase(self, name):
+        """`with profiler.phase("physics"):` times the block into this frame."""
+        timer = self.phases.get(name)
+        if timer is None:
+            timer = self.phases[name] = _Phase(self, name)
+        return timer
+
+    def count(self, name, value):
+        """Records a counter (not a time) for this frame, e.g. live particles."""
+        self.frame[name] = value
+
+    def _on_gc(self, stage, info):
+        if stage == "start":
+            self._gc_started = perf_counter()
+        elif self._gc_started is not None:
+            self.frame["gc"] = self.frame.get("gc", 0.0) + perf_counter() - self._gc_started
+            self._gc_started = None
+
+    def begin_frame(self):
+        self._frame_started = perf_counter()
+
+    def end_frame(self):
+        if self._frame_started is None:
+            return
+        frame = self.frame
+        frame["frame"] = perf_counter() - self._frame_started
+        blocks = sys.getallocatedblocks()
+        frame["alloc_blocks"] = blocks - self._blocks
+        self._blocks = blocks
+        frame["index"] = self.frame_index
+
+        self.history.append(frame)
+        if self.trace is not None:
+            self.trace.append(frame)
+        self.frame = {}
+        self.frame_index += 1
+        self._frame_started = None
+
+    #####################
+    # Reporting
+    #####################
+
+    TIME_KEYS_FIRST = ("frame",)
+    COUNT_KEYS = ("index", "particles", "ticks", "alloc_blocks")
+
+    def columns(self, frames):
+        seen = dict.fromkeys(self.TIME_KEYS_FIRST)
+        for frame in frames:
+            seen.update(dict.fromkeys(frame))
+        times = [k for k in seen if k not in self.COUNT_KEYS]
+        counts = [k for k in self.COUNT_KEYS if k in seen]
+        return times, counts
+
+    def summary(self, frames=None):
+        """{phase: {"mean", "p50", "p99", "max"}} in milliseconds, plus counter means."""
+        frames = list(self.history if frames is None else frames)
+        if not frames:
+            return {}
+        times, counts = self.columns(frames)
+        result = {}
+        for key in times:
+            ms = np.array([f.get(key, 0.0) for f in frames]) * 1000
+            result[key] = {
+                "mean": float(ms.mean()),
+                "p50": float(np.percentile(ms, 50)),
+                "p99": float(np.percentile(ms, 99)),
+                "max": float(ms.max()),
+            }
+        for key in counts:
+            if key != "index":
+                result[key] = {"mean": float(np.mean([f.get(key, 0) for f in frames]))}
+        return result
+
+    def overlay_lines(self):
+        """Short text lines for the on-screen HUD, from the recent frames."""
+        stats = self.summary()
+        if "frame" not in stats:
+            return ["profiler: waiting for frames"]
+        frame = stats["frame"]
+        fps = 1000 / frame["mean"] if frame["mean"] else 0
+        lines = [f"{fps:5.0f} fps  frame p50 {frame['p50']:.2f}  p99 {frame['p99']:.2f} ms"]
+        for key, values in stats.items():
+            if key != "frame" and "p99" in values:
+                lines.append(f"{key:<15} {values['mean']:6.3f}  p99 {values['p99']:6.3f}")
+        last = self.history[-1]
+        lines.append(f"particles {last.get('particles', 0)}  "
+                     f"alloc {stats['alloc_blocks']['mean']:+.0f} blocks/frame")
+        return lines
+
+    def export(self, path):
+        """Writes the full trace (needs keep_trace) as .csv or .json."""
+        frames = self.trace if self.trace is not None else list(self.history)
+        times, counts = self.columns(frames)
+        if path.endswith(".json"):
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"summary_ms": self.summary(frames), "frames": frames}, f, indent=1)
+            return
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(counts + [f"{key}_ms" for key in times])
+            for frame in frames:
+                writer.writerow([frame.get(key, 0) for key in counts]
+                                + [f"{frame.get(key, 0.0) * 1000:.4f}" for key in times])
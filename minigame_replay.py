@@ -0,0 +1,80 @@
+"""
+Input recordings for MiniGame.
+
+The game is deterministic given its RNG seed and the buttons held on every
+physics tick, so that is all a recording stores:
+
+    header  magic "PKTK", format version, PHYSICS_HZ, seed, tick count,
+            digest of the game state after the last tick
+    body    one button bitmask byte per tick, zlib-compressed (held keys
+            repeat a lot, so an hour of play is a few KB)
+
+Replaying feeds the same buttons back into step() with the same seed and
+checks the end state against the digest, which makes a recording usable as
+a regression test for the physics.
+
+    python MiniGame --record bug.pktk
+    python MiniGame --replay bug.pktk --headless
+"""
+import hashlib
+import struct
+import zlib
+
+MAGIC = b"PKTK"
+VERSION = 1
+HEADER = struct.Struct("<4sBHQI8s")
+MAX_SEED = 2**64 - 1  # the header's seed field is a uint64
+
+# Button bits, one byte per tick
+BUTTON_UP = 1
+BUTTON_DOWN = 2
+
+
+class ReplayError(ValueError):
+    """Raised for files that aren't recordings, or were made with different rules."""
+
+
+def state_digest(state):
+    """8-byte digest of a tuple of game state values (repr'd, so floats must match exactly)."""
+    return hashlib.blake2b(repr(state).encode(), digest_size=8).digest()
+
+
+class Recording:
+    """A seed plus the buttons held on every tick."""
+
+    def __init__(self, seed, physics_hz, buttons=None, digest=bytes(8)):
+        self.seed = seed
+        self.physics_hz = physics_hz
+        self.buttons = bytearray(buttons or ())
+        self.digest = digest
+
+    def __len__(self):
+        return len(self.buttons)
+
+    def record(self, buttons):
+        self.buttons.append(buttons)
+
+    def save(self, path):
+        header = HEADER.pack(MAGIC, VERSION, self.physics_hz, self.seed, len(self.buttons), self.digest)
+        with open(path, "wb") as f:
+            f.write(header)
+            f.write(zlib.compress(bytes(self.buttons), 9))
+
+    @classmethod
+    def load(cls, path, physics_hz=None):
+        with open(path, "rb") as f:
+            data = f.read()
+        if len(data) < HEADER.size or data[:4] != MAGIC:
+            raise ReplayError(f"{path} is not a MiniGame recording")
+        magic, version, hz, seed, ticks, digest = HEADER.unpack_from(data)
+        if version != VERSION:
+            raise ReplayError(f"{path} is format version {version}, expected {VERSION}")
+        if physics_hz is not None and hz != physics_hz:
+            raise ReplayError(f"{path} was recorded at {hz} Hz physics, the game runs at {physics_hz} Hz")
+        try:
+            buttons = zlib.decompress(data[HEADER.size:])
+        except zlib.error:
+            raise ReplayError(f"{path} is corrupt or truncated")
+        if len(buttons) != ticks:
+            raise ReplayError(f"{path} is truncated ({len(buttons)} of {ticks} ticks)")
+        return cls(seed, hz, buttons, digest)
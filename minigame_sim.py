@@ -0,0 +1,467 @@
+"""
+Headless Pok-A-Tok matches for tuning the MiniGame AI.
+
+Runs thousands of matches at once, one NumPy array slot per match, with the
+same rules as MiniGame's step() (paddle moves, hoop pull, floor and wall
+bounces, paddle hits, penalties, the scoring countdown) and the constants from
+minigame_physics.py. No window, no pygame. The left paddle is played by a
+policy; the right one is the game's AI with the AI_SPEED / REACTION_ERROR under
+test.
+
+    python minigame_sim.py --matches 2000 --ai-speed 3,4,5,6 --reaction-error 5,15,30
+    python minigame_sim.py --policy random --minutes 5 --json
+
+A rally is the run of paddle hits between a serve and the point (a hoop score
+or a penalty) that ends it. Note the ball can only score in a hoop, so in the
+real game a missed ball only costs a penalty; --miss-point also counts it as a
+point for the other side.
+
+The rules here are a second copy of MiniGame's step(), so they can drift
+apart. `python MiniGame --check-sim` steps one batch lane next to the real
+game with the same inputs and random numbers and stops at the first tick
+where they disagree; run it after changing either side.
+"""
+import argparse
+import itertools
+import json
+import sys
+import time
+
+import numpy as np
+
+from minigame_physics import (
+    WIDTH, HEIGHT, PADDLE_W, PADDLE_H, PADDLE_MARGIN, BALL_SIZE, PADDLE_SPEED, BALL_SPEED,
+    AI_SPEED, REACTION_ERROR, GRAVITY, HIT_BOUNCE, FLOOR_BOUNCE,
+    HOOP_RADIUS, HOOP_CENTER_TOP, HOOP_CENTER_BOTTOM, PULL_STRENGTH, SCORE_DISTANCE,
+    PHYSICS_HZ, SCORE_COUNTDOWN, SERVE_ANGLE,
+)
+
+LEFT_X = PADDLE_MARGIN
+RIGHT_X = WIDTH - PADDLE_MARGIN - PADDLE_W
+
+
+def to_pixels(values):
+    """What assigning floats to a pygame.Rect does: round half away from zero."""
+    return np.trunc(values + np.copysign(0.5, values))
+
+
+def overlaps(x, y, w, h, ox, oy, ow, oh):
+    """pygame.Rect.colliderect, for arrays of rects."""
+    return (x < ox + ow) & (ox < x + w) & (y < oy + oh) & (oy < y + h)
+
+
+#####################
+# Left paddle policies
+#####################
+#
+# A policy gets the MatchBatch and returns -1 (up), 0 or +1 (down) per match.
+
+def idle_policy(batch):
+    """Never moves."""
+    return np.zeros(batch.n, dtype=np.int8)
+
+
+def random_policy(batch):
+    """Mashes keys: a new random direction every tick."""
+    return batch.rng.integers(-1, 2, batch.n).astype(np.int8)
+
+
+def tracking_policy(error=0):
+    """Follows the ball, like the AI but at full PADDLE_SPEED and on both halves."""
+    def policy(batch):
+        target = batch.y + BALL_SIZE//2
+        if error:
+            target = target + batch.rng.integers(-error, error + 1, batch.n)
+        center = batch.left_y + PADDLE_H//2
+        return np.sign(target - center).astype(np.int8)
+    return policy
+
+
+POLICIES = {
+    "idle": idle_policy,
+    "random": random_policy,
+    "track": tracking_policy(),
+}
+
+
+def make_policy(name):
+    """
+    A policy by name; "track:<error>" tracks the ball with that much aim
+    error. ValueError if there is none by that name.
+    """
+    if name.startswith("track:"):
+        try:
+            error = int(name.split(":", 1)[1])
+        except ValueError:
+            error = -1
+        if error < 0:
+            raise ValueError(f"bad policy '{name}': the error must be a whole number >= 0")
+        return tracking_policy(error)
+    if name not in POLICIES:
+        raise ValueError(f"unknown policy '{name}'")
+    return POLICIES[name]
+
+
+#####################
+# Simulation
+#####################
+
+class MatchBatch:
+    """
+    `n` independent matches stepped together. Mirrors MiniGame's globals.
+    `ai_speed` and `reaction_error` are one value for every match or one per
+    match, so a whole sweep can run as a single batch.
+    """
+
+    def __init__(self, n, ai_speed=AI_SPEED, reaction_error=REACTION_ERROR, seed=None):
+        self.n = n
+        self.ai_speed = np.broadcast_to(np.asarray(ai_speed, dtype=np.int64), (n,))
+        self.reaction_error = np.broadcast_to(np.asarray(reaction_error, dtype=np.int64), (n,))
+        self.rng = np.random.default_rng(seed)
+
+        self.x = np.zeros(n)
+        self.y = np.zeros(n)
+        self.z = np.zeros(n)
+        self.dx = np.zeros(n)
+        self.dy = np.zeros(n)
+        self.vz = np.zeros(n)
+        self.left_y = np.full(n, HEIGHT//2 - PADDLE_H//2, dtype=np.float64)
+        self.right_y = self.left_y.copy()
+
+        self.scoring = np.zeros(n, dtype=bool)
+        self.scoring_hoop = np.zeros(n, dtype=np.int8)   # 0 = top, 1 = bottom
+        self.score_ticks = np.zeros(n, dtype=np.int32)
+
+        self.score_left = np.zeros(n, dtype=np.int32)
+        self.score_right = np.zeros(n, dtype=np.int32)
+        self.misses_left = np.zeros(n, dtype=np.int32)    # penalties: ball got past the left paddle
+        self.misses_right = np.zeros(n, dtype=np.int32)
+        self.rally_hits = np.zeros(n, dtype=np.int32)
+        self.rallies = []                                  # (match indices, hit counts) of finished rallies
+        self.ticks = 0
+
+        self.serve(np.ones(n, dtype=bool), np.zeros(n, dtype=np.int8))
+
+    def serve(self, mask, direction):
+        """reset_ball() for the matches in `mask`. direction: -1 left, +1 right, 0 random."""
+        k = int(np.count_nonzero(mask))
+        if not k:
+            return
+        self.x[mask] = WIDTH // 2
+        self.y[mask] = HEIGHT // 2
+        self.z[mask] = 0
+        self.vz[mask] = 0
+        angle = self.rng.uniform(-SERVE_ANGLE, SERVE_ANGLE, k)
+        direction = np.asarray(direction)[mask].copy()
+        pick = direction == 0
+        if pick.any():
+            direction[pick] = self.rng.choice((-1, 1), int(np.count_nonzero(pick)))
+        self.dx[mask] = direction * BALL_SPEED
+        self.dy[mask] = angle * BALL_SPEED
+
+    def end_rallies(self, mask):
+        if mask.any():
+            self.rallies.append((np.flatnonzero(mask), self.rally_hits[mask].copy()))
+            self.rally_hits[mask] = 0
+
+    def move_paddles(self, left_dir):
+        up = (left_dir < 0) & (self.left_y > 0)
+        down = (left_dir > 0) & (self.left_y + PADDLE_H < HEIGHT)
+        self.left_y += np.where(up, -PADDLE_SPEED, 0) + np.where(down, PADDLE_SPEED, 0)
+
+        # The AI only moves while the ball is on its half
+        watching = self.x + BALL_SIZE//2 > WIDTH // 2
+        # randint(-error, error) per match; rng.integers with array bounds is much slower
+        jitter = np.floor(self.rng.random(self.n) * (2 * self.reaction_error + 1)) - self.reaction_error
+        target = self.y + BALL_SIZE//2 + jitter
+        center = self.right_y + PADDLE_H//2
+        up = watching & (target < center) & (self.right_y > 0)
+        down = watching & (target > center) & (self.right_y + PADDLE_H < HEIGHT)
+        self.right_y -= np.where(up, np.minimum(self.ai_speed, center - target), 0)
+        self.right_y += np.where(down, np.minimum(self.ai_speed, target - center), 0)
+        self.right_y = to_pixels(self.right_y)
+
+    def hoop_pull(self, live):
+        for hoop, (hx, hy) in enumerate((HOOP_CENTER_TOP, HOOP_CENTER_BOTTOM)):
+            over = live & overlaps(self.x, self.y, BALL_SIZE, BALL_SIZE,
+                                   hx - HOOP_RADIUS, hy - HOOP_RADIUS, HOOP_RADIUS*2, HOOP_RADIUS*2)
+            if not over.any():
+                continue
+            self.x = np.where(over, to_pixels(self.x + (hx - (self.x + BALL_SIZE/2)) * PULL_STRENGTH), self.x)
+            self.y = np.where(over, to_pixels(self.y + (hy - (self.y + BALL_SIZE/2)) * PULL_STRENGTH), self.y)
+            self.z = np.where(over, np.minimum(HIT_BOUNCE, self.z + 1), self.z)
+            self.vz = np.where(over, np.maximum(self.vz, 2), self.vz)
+            scored = (over
+                      & (np.abs(self.x + BALL_SIZE/2 - hx) < SCORE_DISTANCE)
+                      & (np.abs(self.y + BALL_SIZE/2 - hy) < SCORE_DISTANCE))
+            if scored.any():
+                # Like the game, the top hoop scores for the left side
+                if hoop == 0:
+                    self.score_left += scored
+                else:
+                    self.score_right += scored
+                self.scoring |= scored
+                self.scoring_hoop[scored] = hoop
+                self.end_rallies(scored)
+
+    def paddle_hits(self):
+        for paddle_x, paddle_y, sign in ((LEFT_X, self.left_y, 1), (RIGHT_X, self.right_y, -1)):
+            hit = (self.z <= 0) & overlaps(self.x, self.y, BALL_SIZE, BALL_SIZE,
+                                           paddle_x, paddle_y, PADDLE_W, PADDLE_H)
+            if not hit.any():
+                continue
+            self.dx = np.where(hit, sign * np.abs(self.dx), self.dx)
+            self.vz = np.where(hit, HIT_BOUNCE, self.vz)
+            offset = (self.y + BALL_SIZE//2) - (paddle_y + PADDLE_H//2)
+            self.dy = np.where(hit, offset / (PADDLE_H / 2) * BALL_SPEED, self.dy)
+            self.rally_hits += hit
+
+    def penalties(self):
+        out_right = self.x + BALL_SIZE >= WIDTH
+        out_left = self.x <= 0
+        out = out_right | out_left
+        if not out.any():
+            return
+        self.misses_right += out_right
+        self.misses_left += out_left
+        self.end_rallies(out)
+        self.serve(out, np.where(out_right, -1, 1))
+
+    def step(self, left_dir):
+        """One physics tick of every match, like MiniGame's step()."""
+        self.move_paddles(left_dir)
+
+        live = ~self.scoring
+        self.x = np.where(live, to_pixels(self.x + self.dx), self.x)
+        self.y = np.where(live, to_pixels(self.y + self.dy), self.y)
+        self.vz = np.where(live, self.vz - GRAVITY, self.vz)
+        self.z = np.where(live, self.z + self.vz, self.z)
+
+        self.hoop_pull(live)
+
+        floor = live & (self.z < 0)
+        self.z[floor] = 0
+        self.vz[floor] *= -FLOOR_BOUNCE
+
+        top = live & (self.y <= 0)
+        self.y[top] = 0
+        self.dy[top] *= -1
+        bottom = live & (self.y + BALL_SIZE >= HEIGHT)
+        self.y[bottom] = HEIGHT - BALL_SIZE
+        self.dy[bottom] *= -1
+
+        self.paddle_hits()
+        self.penalties()
+
+        # Ball sits in the hoop for the countdown, then a random serve
+        if self.scoring.any():
+            held = self.scoring
+            hx = np.where(self.scoring_hoop == 0, HOOP_CENTER_TOP[0], HOOP_CENTER_BOTTOM[0])
+            hy = np.where(self.scoring_hoop == 0, HOOP_CENTER_TOP[1], HOOP_CENTER_BOTTOM[1])
+            self.x[held] = to_pixels(hx - BALL_SIZE/2)[held]
+            self.y[held] = to_pixels(hy - BALL_SIZE/2)[held]
+            for arr in (self.z, self.dx, self.dy, self.vz):
+                arr[held] = 0
+            self.score_ticks[held] += 1
+            done = held & (self.score_ticks >= SCORE_COUNTDOWN * PHYSICS_HZ)
+            if done.any():
+                self.serve(done, np.zeros(self.n, dtype=np.int8))
+                self.scoring[done] = False
+                self.score_ticks[done] = 0
+
+        self.ticks += 1
+
+    def state(self, i):
+        """Match `i` as the same tuple as LOCKSTEP_FIELDS (see MiniGame --check-sim)."""
+        return (self.x[i], self.y[i], self.z[i], self.left_y[i], self.right_y[i],
+                self.dx[i], self.dy[i], self.vz[i], bool(self.scoring[i]),
+                int(self.score_left[i]), int(self.score_right[i]))
+
+    def run(self, policy, ticks):
+        for _ in range(ticks):
+            self.step(policy(self))
+        return self
+
+    def results(self, miss_point=False, group=None):
+        """Win rates and rally stats for the matches so far (or the ones in the `group` mask)."""
+        if group is None:
+            group = np.ones(self.n, dtype=bool)
+        left = (self.score_left + (self.misses_right if miss_point else 0))[group]
+        right = (self.score_right + (self.misses_left if miss_point else 0))[group]
+        rallies = np.zeros(0, dtype=np.int32)
+        if self.rallies:
+            idx = np.concatenate([r[0] for r in self.rallies])
+            rallies = np.concatenate([r[1] for r in self.rallies])[group[idx]]
+        minutes = self.ticks / PHYSICS_HZ / 60
+        per_min = lambda counts: float(counts[group].mean() / minutes) if minutes else 0.0
+        return {
+            "ai_speed": int(self.ai_speed[group][0]),
+            "reaction_error": int(self.reaction_error[group][0]),
+            "matches": int(np.count_nonzero(group)),
+            "minutes": minutes,
+            "left_win": float(np.mean(left > right)),
+            "draw": float(np.mean(left == right)),
+            "right_win": float(np.mean(left < right)),
+            "hoops_per_min": per_min(self.score_left + self.score_right),
+            "ai_misses_per_min": per_min(self.misses_right),
+            "player_misses_per_min": per_min(self.misses_left),
+            "rallies": int(rallies.size),
+            "rally_mean": float(rallies.mean()) if rallies.size else 0.0,
+            "rally_p50": float(np.percentile(rallies, 50)) if rallies.size else 0.0,
+            "rally_p90": float(np.percentile(rallies, 90)) if rallies.size else 0.0,
+            "rally_max": int(rallies.max()) if rallies.size else 0,
+        }
+
+
+#####################
+# Lockstep check
+#####################
+#
+# For MiniGame --check-sim: the game and one batch lane draw their serves and
+# the AI's aim error from the same numbers, so given the same inputs they
+# have to end every tick in the same state.
+
+LOCKSTEP_FIELDS = ("x", "y", "z", "left_y", "right_y", "dx", "dy", "vz",
+                   "scoring", "score_left", "score_right")
+
+
+class LockstepRandom:
+    """
+    One seeded source of serves (angle, direction) and per-tick aim error.
+    game_view() stands in for MiniGame's random.Random, lane_view() for a
+    MatchBatch's Generator (one lane); each side takes the serves in order.
+    """
+
+    def __init__(self, seed=None):
+        self.source = np.random.default_rng(seed)
+        self.angles = []      # uniform 0..1 per serve
+        self.directions = []  # 0 or 1 per serve
+        self.aim = 0.0        # uniform 0..1 for this tick's aim error
+
+    def next_tick(self):
+        self.aim = float(self.source.random())
+
+    def serve(self, index):
+        while len(self.angles) <= index:
+            self.angles.append(float(self.source.random()))
+            self.directions.append(int(self.source.integers(2)))
+        return self.angles[index], self.directions[index]
+
+    def game_view(self):
+        return _GameRandom(self)
+
+    def lane_view(self):
+        return _LaneRandom(self)
+
+
+class _GameRandom:
+    """The random.Random calls MiniGame makes."""
+
+    def __init__(self, shared):
+        self.shared = shared
+        self.serves = 0
+
+    def uniform(self, low, high):
+        angle, _ = self.shared.serve(self.serves)
+        self.serves += 1
+        return low + (high - low) * angle
+
+    def choice(self, seq):
+        return seq[self.shared.serve(self.serves - 1)[1]]
+
+    def randint(self, low, high):
+        return low + int(self.shared.aim * (high - low + 1))
+
+
+class _LaneRandom:
+    """The Generator calls MatchBatch makes, for a batch of one."""
+
+    def __init__(self, shared):
+        self.shared = shared
+        self.serves = 0
+
+    def uniform(self, low, high, size):
+        angle, _ = self.shared.serve(self.serves)
+        self.serves += 1
+        return np.full(size, low + (high - low) * angle)
+
+    def choice(self, seq, size):
+        return np.full(size, seq[self.shared.serve(self.serves - 1)[1]])
+
+    def random(self, size):
+        return np.full(size, self.shared.aim)
+
+
+def sweep(ai_speeds, reaction_errors, policy_name="track", matches=1000, minutes=3.0,
+          seed=None, miss_point=False):
+    """
+    Plays `matches` matches for every (AI_SPEED, REACTION_ERROR) pair, all in
+    one batch, and returns one results dict per pair.
+    """
+    pairs = list(itertools.product(ai_speeds, reaction_errors))
+    group_of = np.repeat(np.arange(len(pairs)), matches)
+    speeds = np.array([speed for speed, _ in pairs])[group_of]
+    errors = np.array([error for _, error in pairs])[group_of]
+
+    batch = MatchBatch(len(group_of), speeds, errors, seed=seed)
+    batch.run(make_policy(policy_name), int(minutes * 60 * PHYSICS_HZ))
+    return [batch.results(miss_point, group_of == i) for i in range(len(pairs))]
+
+
+#####################
+# Report
+#####################
+
+def print_report(results, policy_name, elapsed):
+    matches = sum(r["matches"] for r in results)
+    ticks = sum(r["matches"] * r["minutes"] * 60 * PHYSICS_HZ for r in results)
+    print(f"{matches} matches vs '{policy_name}' in {elapsed:.1f}s ({ticks / elapsed:,.0f} match-ticks/s)")
+    print()
+    print(f"{'speed':>5} {'error':>5} | {'left':>6} {'draw':>6} {'right':>6} | "
+          f"{'AI miss/min':>11} {'hoops/min':>9} | {'rally':>5} {'p90':>4} {'max':>4}")
+    for r in results:
+        print(f"{r['ai_speed']:>5} {r['reaction_error']:>5} | "
+              f"{r['left_win']:6.1%} {r['draw']:6.1%} {r['right_win']:6.1%} | "
+              f"{r['ai_misses_per_min']:11.2f} {r['hoops_per_min']:9.2f} | "
+              f"{r['rally_mean']:5.1f} {r['rally_p90']:4.0f} {r['rally_max']:4}")
+
+
+def number_list(text):
+    return [int(v) for v in text.split(",") if v]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless MiniGame matches for AI tuning")
+    parser.add_argument("--matches", type=int, default=1000, help="matches per parameter set")
+    parser.add_argument("--minutes", type=float, default=3.0, help="game time per match")
+    parser.add_argument("--ai-speed", type=number_list, default=[AI_SPEED],
+                        help="comma separated AI_SPEED values to try")
+    parser.add_argument("--reaction-error", type=number_list, default=[REACTION_ERROR],
+                        help="comma separated REACTION_ERROR values to try")
+    parser.add_argument("--policy", default="track",
+                        help="left paddle: idle, random, track or track:<error>")
+    parser.add_argument("--miss-point", action="store_true",
+                        help="count a penalty as a point for the other side")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args(argv)
+
+    try:
+        make_policy(args.policy)
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    began = time.perf_counter()
+    results = sweep(args.ai_speed, args.reaction_error, args.policy, args.matches,
+                    args.minutes, args.seed, args.miss_point)
+    elapsed = time.perf_counter() - began
+
+    if args.json:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    else:
+        print_report(results, args.policy, elapsed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Server-side timing of Streamlit runs.
+
+Every time st1.py runs (a full rerun after a click, or just a fragment) the
+time spent in the script is recorded here. One RerunStats is shared by all
+sessions in the process (st1.py keeps it in st.cache_resource), so the
+numbers reflect the server under whatever load it has.
+
+Only the script's own time is measured: not the network, and not the
+browser drawing the page.
+"""
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class RerunStats:
+    """Rolling window of run times per kind ("app", "fragment", ...), thread-safe."""
+
+    def __init__(self, window=2000, budget_ms=50):
+        self.window = window
+        self.budget_ms = budget_ms
+        self.samples = defaultdict(lambda: deque(maxlen=window))
+        self.totals = defaultdict(int)
+        self.lock = threading.Lock()
+
+    def record(self, kind, seconds):
+        with self.lock:
+            self.samples[kind].append(seconds * 1000)
+            self.totals[kind] += 1
+
+    @contextmanager
+    def measure(self, kind):
+        """Times the block, also when it ends in st.rerun() / st.stop() (they raise)."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(kind, time.perf_counter() - started)
+
+    def summary(self):
+        """{kind: {count, mean, p50, p95, p99, max, over_budget}} over the window, in ms."""
+        with self.lock:
+            snapshot = {kind: sorted(values) for kind, values in self.samples.items()}
+            totals = dict(self.totals)
+        result = {}
+        for kind, values in snapshot.items():
+            if not values:
+                continue
+            result[kind] = {
+                "count": totals[kind],
+                "mean": sum(values) / len(values),
+                "p50": percentile(values, 50),
+                "p95": percentile(values, 95),
+                "p99": percentile(values, 99),
+                "max": values[-1],
+                "over_budget": sum(v > self.budget_ms for v in values) / len(values),
+            }
+        return result
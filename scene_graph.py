@@ -0,0 +1,192 @@
+"""
+The story as data.
+
+Both front ends (terminal-based.py and st1.py) read their scenes from
+scenes.json through this module instead of hard-coding them. The file is
+loaded and validated once; after that every scene is an object with
+precomputed option tables, and moving through the story is a single dict
+lookup on (scene, choice key).
+
+Scene kinds:
+    intro     - title screen, one choice that starts the run
+    choice    - a story scene: narration, a question and a few choices
+    ballgame  - the ball court; its choices are "win" and "lose"
+    ending    - the victory screen
+    game_over - the failure screen ("retry" / "quit")
+"""
+import json
+import os
+from collections import namedtuple
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "scenes.json")
+
+SCENE_KINDS = ("intro", "choice", "ballgame", "ending", "game_over")
+WEB_TEXT_STYLES = ("write", "info", "warning", "error", "success")
+
+# Where a choice leads. `next` is None when the game ends (e.g. "Quit").
+Transition = namedtuple("Transition", "key label next outcome reason web_reason toast gain")
+Shot = namedtuple("Shot", "key label scores text")
+
+
+class SceneGraphError(ValueError):
+    """Raised when scenes.json is malformed. Lists every problem found."""
+
+    def __init__(self, problems):
+        self.problems = problems
+        super().__init__("Invalid scene graph:\n  - " + "\n  - ".join(problems))
+
+
+class Scene:
+    """One scene from scenes.json, with its option tables built up front."""
+
+    def __init__(self, scene_id, data):
+        self.id = scene_id
+        self.kind = data.get("kind", "choice")
+        self.title = data.get("title", "")
+        self.banner = data.get("banner", self.title.upper())
+        self.progress = data.get("progress")
+        self.progress_text = data.get("progress_text", "")
+        self.text = tuple(data.get("text", ()))
+        self.web_text = tuple(tuple(block) for block in data.get("web_text", ()))
+        self.prompt = data.get("prompt", "What will you do?")
+        self.button = data.get("button", "Make Choice")
+        self.primary = bool(data.get("primary", False))
+
+        self.choices = tuple(
+            Transition(
+                key=str(c.get("key", "")),
+                label=c.get("label", ""),
+                next=c.get("next"),
+                outcome=tuple(c.get("outcome", ())),
+                reason=c.get("reason", ""),
+                web_reason=c.get("web_reason", c.get("reason", "")),
+                toast=c.get("toast", ""),
+                gain=c.get("gain"),
+            )
+            for c in data.get("choices", ())
+        )
+        # key -> label, in file order (what get_choice() expects)
+        self.options = {c.key: c.label for c in self.choices}
+        self.labels = tuple(c.label for c in self.choices)
+        self.key_for_label = {c.label: c.key for c in self.choices}
+
+        # Ball court settings
+        self.rounds = data.get("rounds", 0)
+        self.min_score = data.get("min_score", 0)
+        self.shots = tuple(
+            Shot(str(s.get("key", "")), s.get("label", ""), bool(s.get("scores")), s.get("text", ""))
+            for s in data.get("shots", ())
+        )
+        self.shot_options = {s.key: s.label for s in self.shots}
+        self.shot_for_key = {s.key: s for s in self.shots}
+
+
+class SceneGraph:
+    """All scenes plus a flat (scene id, choice key) -> Transition table."""
+
+    def __init__(self, start_scene, scenes):
+        self.start_scene = start_scene
+        self.scenes = scenes
+        self._transitions = {
+            (scene.id, choice.key): choice
+            for scene in scenes.values()
+            for choice in scene.choices
+        }
+
+    def __getitem__(self, scene_id):
+        return self.scenes[scene_id]
+
+    def __contains__(self, scene_id):
+        return scene_id in self.scenes
+
+    def transition(self, scene_id, key):
+        """Returns the Transition for picking `key` in `scene_id`."""
+        return self._transitions[(scene_id, key)]
+
+    def successors(self, scene_id):
+        """Scene ids reachable in one step from `scene_id`."""
+        scene = self.scenes[scene_id]
+        return tuple(dict.fromkeys(c.next for c in scene.choices if c.next))
+
+
+def validate(data):
+    """Returns a list of problems with the raw scenes.json data (empty if fine)."""
+    problems = []
+    scenes = data.get("scenes")
+    if not isinstance(scenes, dict) or not scenes:
+        return ["'scenes' must be a non-empty object"]
+
+    start = data.get("start_scene")
+    if start not in scenes:
+        problems.append(f"start_scene '{start}' is not a scene")
+
+    for scene_id, scene in scenes.items():
+        kind = scene.get("kind", "choice")
+        if kind not in SCENE_KINDS:
+            problems.append(f"{scene_id}: unknown kind '{kind}'")
+
+        choices = scene.get("choices", [])
+        if not choices:
+            problems.append(f"{scene_id}: has no choices")
+        keys = [str(c.get("key", "")) for c in choices]
+        if len(set(keys)) != len(keys):
+            problems.append(f"{scene_id}: duplicate choice keys {keys}")
+
+        for choice in choices:
+            key = choice.get("key")
+            if not key:
+                problems.append(f"{scene_id}: choice without a key")
+            target = choice.get("next")
+            if target is not None and target not in scenes:
+                problems.append(f"{scene_id}/{key}: next scene '{target}' does not exist")
+            if kind != "ballgame" and not choice.get("label"):
+                problems.append(f"{scene_id}/{key}: missing label")
+            if target == "game_over" and not choice.get("reason"):
+                problems.append(f"{scene_id}/{key}: leads to game_over without a reason")
+
+        for block in scene.get("web_text", []):
+            if len(block) != 2 or block[0] not in WEB_TEXT_STYLES:
+                problems.append(f"{scene_id}: bad web_text block {block!r}")
+
+        if kind == "ballgame":
+            if sorted(keys) != ["lose", "win"]:
+                problems.append(f"{scene_id}: a ballgame needs exactly a 'win' and a 'lose' choice")
+            if not scene.get("shots"):
+                problems.append(f"{scene_id}: a ballgame needs shots")
+            if scene.get("rounds", 0) < 1:
+                problems.append(f"{scene_id}: a ballgame needs at least one round")
+
+    # Every scene should be reachable from the start
+    if start in scenes:
+        seen = {start}
+        todo = [start]
+        while todo:
+            for choice in scenes[todo.pop()].get("choices", []):
+                target = choice.get("next")
+                if target in scenes and target not in seen:
+                    seen.add(target)
+                    todo.append(target)
+        for scene_id in scenes:
+            if scene_id not in seen:
+                problems.append(f"{scene_id}: not reachable from '{start}'")
+
+    return problems
+
+
+def load_scene_graph(path=DEFAULT_PATH):
+    """Loads and validates scenes.json. Raises SceneGraphError if it is broken."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    problems = validate(data)
+    if problems:
+        raise SceneGraphError(problems)
+
+    scenes = {scene_id: Scene(scene_id, raw) for scene_id, raw in data["scenes"].items()}
+    return SceneGraph(data["start_scene"], scenes)
+
+
+if __name__ == "__main__":
+    graph = load_scene_graph()
+    for scene in graph.scenes.values():
+        print(f"{scene.id:18} {scene.kind:10} -> {', '.join(graph.successors(scene.id)) or '(end)'}")
@@ -0,0 +1,273 @@
+"""
+Screen rendering for terminal-based.py.
+
+Clearing used to mean os.system('clear'): a whole new process for every
+scene, and a full repaint of everything. Now each session keeps a model of
+its screen (a grid of characters plus a cursor). The game writes into the
+model, and render() works out what differs from what the terminal already
+shows and sends just that: a cursor move and the changed characters, "erase
+to end of line" / "erase below" for stretches that became blank, and real
+terminal scrolling when text runs off the bottom.
+
+So clearing the screen costs nothing by itself; the next render erases the
+old lines and skips any characters the new scene has in the same place (the
+"--- BANNER ---" lines, the choice menus, ...).
+
+The screen sets the terminal's scroll region to its own rows, so a window
+taller than the model still scrolls where the model does. Send restore()
+before leaving to give the terminal its full scroll region back.
+
+    screen = make_screen(tty=True, term=os.environ.get("TERM", ""))
+    screen.write("hello\n")
+    stream.write(screen.render())
+
+Dumb terminals and pipes get PlainScreen, which passes text through with no
+escape codes at all; a clear becomes a blank line.
+
+Wide characters (CJK, emoji) are treated as one column; the game's text
+doesn't use them.
+"""
+import os
+
+DUMB_TERMS = ("", "dumb", "unknown")
+TAB_SIZE = 8
+
+# Moving the cursor costs a few bytes, so unchanged runs shorter than this
+# are re-sent instead of jumped over.
+MIN_SKIP = 6
+
+
+def cursor_to(x, y):
+    return f"\x1b[{y + 1};{x + 1}H"
+
+
+class PlainScreen:
+    """Pass-through for terminals that don't understand escape codes."""
+
+    def __init__(self):
+        self.buffer = []
+
+    def write(self, text):
+        self.buffer.append(text)
+
+    def clear(self):
+        self.buffer.append("\n")
+
+    def echoed(self, text):
+        """The terminal already shows `text` (the player typed it); nothing to do here."""
+
+    def resize(self, cols, rows):
+        pass
+
+    def restore(self):
+        return ""
+
+    def render(self):
+        """Everything written since the last render."""
+        out = "".join(self.buffer)
+        self.buffer = []
+        return out
+
+
+class AnsiScreen:
+    """
+    `cells` is what the game wants on screen, `shown` is what the terminal
+    shows. render() sends the difference and makes them equal.
+    """
+
+    def __init__(self, cols=80, rows=24):
+        self.resize(cols, rows)
+
+    def resize(self, cols, rows):
+        """Starts over at a new size; the next render repaints everything."""
+        self.cols = max(1, cols)
+        self.rows = max(1, rows)
+        self.cells = [[" "] * self.cols for _ in range(self.rows)]
+        self.shown = [[" "] * self.cols for _ in range(self.rows)]
+        self.x = self.y = 0                  # model cursor
+        self.shown_x = self.shown_y = None   # terminal cursor, None if unknown
+        self.scrolled = 0                    # lines the model scrolled since the last render
+        self.repaint = True
+        self.region_set = False
+
+    #####################
+    # Model
+    #####################
+
+    def write(self, text):
+        cells = self.cells
+        cols = self.cols
+        for ch in text:
+            if ch == "\n":
+                self._newline()
+            elif ch == "\r":
+                self.x = 0
+            elif ch == "\t":
+                self.write(" " * (TAB_SIZE - self.x % TAB_SIZE))
+            elif ch >= " ":
+                if self.x >= cols:
+                    self._newline()
+                cells[self.y][self.x] = ch
+                self.x += 1
+
+    def _newline(self):
+        self.x = 0
+        if self.y < self.rows - 1:
+            self.y += 1
+        else:
+            self.cells.pop(0)
+            self.cells.append([" "] * self.cols)
+            self.scrolled += 1
+
+    def clear(self):
+        """Blanks the model. Nothing is sent until the next render."""
+        for row in self.cells:
+            row[:] = [" "] * self.cols
+        self.x = self.y = 0
+        self.scrolled = 0   # everything is redrawn anyway, no point scrolling first
+
+    def echoed(self, text):
+        """
+        The terminal already printed `text` itself (the player's typing,
+        echoed locally, ending with their ENTER). Brings both grids up to date
+        without sending anything.
+        """
+        pending = self.render()
+        if pending:
+            raise RuntimeError("render() output must be sent before echoed()")
+        self.write(text)
+        self.shown = [row[:] for row in self.cells]
+        self.shown_x, self.shown_y = self.x, self.y
+        self.scrolled = 0
+
+    def restore(self):
+        """Gives the terminal back its full-height scroll region (see render), cursor kept."""
+        if not self.region_set:
+            return ""
+        self.region_set = False
+        return "\x1b7\x1b[r\x1b8"
+
+    #####################
+    # Diff
+    #####################
+
+    def render(self):
+        """Escape codes and text that turn what's shown into the model."""
+        out = []
+        shown = self.shown
+
+        if self.repaint:
+            # Scroll inside our rows only. In a taller window a newline on our
+            # bottom row would just move the cursor down instead of
+            # scrolling, and `shown` would drift from the real screen.
+            out.append(f"\x1b[1;{self.rows}r\x1b[H\x1b[2J")
+            self.region_set = True
+            for row in shown:
+                row[:] = [" "] * self.cols
+            self.shown_x = self.shown_y = 0
+            self.repaint = False
+            self.scrolled = 0
+
+        if self.scrolled:
+            # Let the terminal scroll: newlines on the bottom row move
+            # everything up, so the old lines don't have to be resent
+            lines = min(self.scrolled, self.rows)
+            out.append(cursor_to(0, self.rows - 1) + "\n" * lines)
+            del shown[:lines]
+            shown.extend([" "] * self.cols for _ in range(lines))
+            self.shown_x, self.shown_y = 0, self.rows - 1
+            self.scrolled = 0
+
+        # Below the last non-blank model row, one "erase below" does it all
+        last_used = self.rows - 1
+        while last_used >= 0 and not "".join(self.cells[last_used]).strip():
+            last_used -= 1
+
+        for y in range(last_used + 1):
+            if self.cells[y] != shown[y]:
+                self._render_row(y, out)
+
+        blank_below = last_used + 1
+        if blank_below < self.rows and any("".join(row).strip() for row in shown[blank_below:]):
+            self._move(0, blank_below, out)
+            out.append("\x1b[J")
+            for row in shown[blank_below:]:
+                row[:] = [" "] * self.cols
+
+        if self.x < self.cols:
+            self._move(self.x, self.y, out)
+        elif (self.shown_x, self.shown_y) != (self.x, self.y):
+            # The model's cursor is past the margin, so the player's typing
+            # wraps to the next line. Rewriting the last cell puts the
+            # terminal's cursor in the same spot (a move can't).
+            self._move(self.cols - 1, self.y, out)
+            out.append(self.cells[self.y][-1])
+            self.shown_x = self.cols
+        return "".join(out)
+
+    def _render_row(self, y, out):
+        want, have = self.cells[y], self.shown[y]
+        cols = self.cols
+        want_end = len("".join(want).rstrip())
+        have_end = len("".join(have).rstrip())
+
+        x = 0
+        while x < want_end:
+            if want[x] == have[x]:
+                x += 1
+                continue
+            # Extend the run until MIN_SKIP cells in a row already match
+            end = x + 1
+            same = 0
+            while end < want_end and same < MIN_SKIP:
+                same = same + 1 if want[end] == have[end] else 0
+                end += 1
+            end -= same
+            self._move(x, y, out)
+            out.append("".join(want[x:end]))
+            have[x:end] = want[x:end]
+            self.shown_x = end   # == cols: parked past the margin, the next character wraps
+            x = end
+
+        if have_end > want_end:
+            self._move(want_end, y, out)
+            out.append("\x1b[K")
+            have[want_end:] = [" "] * (cols - want_end)
+
+    def _move(self, x, y, out):
+        if (self.shown_x, self.shown_y) == (x, y):
+            return
+        if self.shown_y == y and self.shown_x is not None and x == 0:
+            out.append("\r")
+        else:
+            out.append(cursor_to(x, y))
+        self.shown_x, self.shown_y = x, y
+
+
+def enable_windows_ansi():
+    """Turns on escape code handling in a Windows console. False if it can't."""
+    try:
+        import ctypes
+        import ctypes.wintypes
+
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.GetStdHandle(-11)   # STD_OUTPUT_HANDLE
+        mode = ctypes.wintypes.DWORD()
+        if not kernel32.GetConsoleMode(handle, ctypes.byref(mode)):
+            return False
+        ENABLE_VIRTUAL_TERMINAL_PROCESSING = 0x0004
+        return bool(kernel32.SetConsoleMode(handle, mode.value | ENABLE_VIRTUAL_TERMINAL_PROCESSING))
+    except (AttributeError, OSError):
+        return False
+
+
+def make_screen(tty, term, size=(80, 24)):
+    """AnsiScreen for a real terminal, PlainScreen for pipes and dumb terminals."""
+    if not tty:
+        return PlainScreen()
+    if os.name == "nt":
+        if not enable_windows_ansi():
+            return PlainScreen()
+    elif term in DUMB_TERMS:
+        return PlainScreen()
+    return AnsiScreen(*size)
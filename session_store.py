@@ -0,0 +1,237 @@
+"""
+Saved game progress for st1.py.
+
+Streamlit keeps st.session_state per browser connection, so progress used to
+vanish when the websocket dropped or the server restarted. st1.py now puts a
+session id in the URL (?sid=...) and saves the progress fields to a store
+after every run; opening the URL again resumes the game.
+
+The sid is a bearer token: whoever has the URL can resume (and play on) that
+game, so it's random and unguessable, and a shared link shares the game.
+
+The store also remembers spent win code nonces (claim_nonce), so a code
+redeemed on one server process can't be redeemed again on another.
+
+Backends (pick with XIBALBA_SESSION_STORE, see make_store):
+    memory          - in-process LRU (default). Survives reconnects, not
+                      restarts, and isn't shared between server processes.
+    sqlite:<path>   - SQLite file. Survives restarts, and every server process
+                      on the host (or sharing the file) sees the same games,
+                      so a load balancer doesn't need sticky sessions. Writes
+                      are buffered and committed in batches by a background
+                      thread; nonce claims are written straight away. Needs
+                      XIBALBA_WIN_SECRET, so every process signs codes with
+                      the same key.
+
+Another backend (Redis, ...) only needs load / save / delete / claim_nonce /
+flush.
+
+States are stored as compact JSON arrays (field order = FIELDS), about 60
+bytes for a typical game.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+from win_codes import SECRET_ENV, USED_TTL, UsedNonces
+
+FORMAT_VERSION = 1
+FIELDS = ("scene", "inventory", "score", "rounds", "game_over_reason", "win_nonce")
+
+
+def encode_state(state):
+    """dict -> bytes. Missing fields are stored as null."""
+    values = [FORMAT_VERSION] + [state.get(field) for field in FIELDS]
+    return json.dumps(values, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def decode_state(data):
+    """bytes -> dict (only the fields that were set). None if unreadable or from another version."""
+    try:
+        values = json.loads(data)
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(values, list) or not values or values[0] != FORMAT_VERSION:
+        return None
+    return {field: value for field, value in zip(FIELDS, values[1:]) if value is not None}
+
+
+class SessionStore(ABC):
+    """Interface: saved states keyed by session id."""
+
+    @abstractmethod
+    def load(self, sid):
+        """The saved state dict, or None."""
+
+    @abstractmethod
+    def save(self, sid, state):
+        pass
+
+    @abstractmethod
+    def delete(self, sid):
+        pass
+
+    @abstractmethod
+    def claim_nonce(self, nonce):
+        """Marks a win code nonce spent. False if it already was (see win_codes.py)."""
+
+    def flush(self):
+        """Makes buffered writes durable (no-op for unbuffered backends)."""
+
+
+class MemoryStore(SessionStore):
+    """Encoded states in an LRU dict, oldest sessions dropped past `max_sessions`."""
+
+    def __init__(self, max_sessions=10_000):
+        self.max_sessions = max_sessions
+        self.states = OrderedDict()
+        self.lock = threading.Lock()
+        self.used_nonces = UsedNonces()
+
+    def load(self, sid):
+        with self.lock:
+            data = self.states.get(sid)
+            if data is None:
+                return None
+            self.states.move_to_end(sid)
+        return decode_state(data)
+
+    def save(self, sid, state):
+        data = encode_state(state)
+        with self.lock:
+            self.states[sid] = data
+            self.states.move_to_end(sid)
+            while len(self.states) > self.max_sessions:
+                self.states.popitem(last=False)
+
+    def delete(self, sid):
+        with self.lock:
+            self.states.pop(sid, None)
+
+    def claim_nonce(self, nonce):
+        return self.used_nonces.claim_nonce(nonce)
+
+
+class SQLiteStore(SessionStore):
+    """
+    SQLite-backed store with write-behind batching: save() only updates an
+    in-memory pending dict, and a background thread commits everything
+    pending every `flush_interval` seconds in one transaction. Several saves
+    of one session between flushes become a single row write.
+
+    Nonce claims skip the buffer: each is one atomic insert, so two processes
+    redeeming the same code can't both win.
+    """
+
+    def __init__(self, path, flush_interval=0.5, nonce_ttl=USED_TTL):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.nonce_ttl = nonce_ttl
+        self.pending = {}                  # sid -> encoded state, or None to delete
+        self.lock = threading.Lock()       # guards pending
+        self.db_lock = threading.Lock()    # one connection, shared by threads
+
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " sid TEXT PRIMARY KEY, state BLOB NOT NULL, updated REAL NOT NULL)"
+        )
+        self.db.execute("CREATE TABLE IF NOT EXISTS used_nonces (nonce TEXT PRIMARY KEY, expires REAL NOT NULL)")
+
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._flush_loop, name="session-store-flush", daemon=True)
+        self._thread.start()
+
+    def load(self, sid):
+        with self.lock:
+            if sid in self.pending:
+                data = self.pending[sid]
+                return decode_state(data) if data is not None else None
+        with self.db_lock:
+            row = self.db.execute("SELECT state FROM sessions WHERE sid = ?", (sid,)).fetchone()
+        return decode_state(row[0]) if row else None
+
+    def save(self, sid, state):
+        data = encode_state(state)
+        with self.lock:
+            self.pending[sid] = data
+
+    def delete(self, sid):
+        with self.lock:
+            self.pending[sid] = None
+
+    def claim_nonce(self, nonce):
+        now = time.time()
+        with self.db_lock:
+            # Inserts, or takes over an expired claim; a live one changes nothing
+            cursor = self.db.execute(
+                "INSERT INTO used_nonces (nonce, expires) VALUES (?, ?) "
+                "ON CONFLICT(nonce) DO UPDATE SET expires = excluded.expires "
+                "WHERE used_nonces.expires <= ?",
+                (nonce, now + self.nonce_ttl, now),
+            )
+        return cursor.rowcount == 1
+
+    def flush(self):
+        with self.lock:
+            batch, self.pending = self.pending, {}
+        if not batch:
+            return
+        now = time.time()
+        upserts = [(sid, data, now) for sid, data in batch.items() if data is not None]
+        deletes = [(sid,) for sid, data in batch.items() if data is None]
+        with self.db_lock:
+            self.db.execute("BEGIN")
+            try:
+                self.db.executemany(
+                    "INSERT INTO sessions (sid, state, updated) VALUES (?, ?, ?) "
+                    "ON CONFLICT(sid) DO UPDATE SET state = excluded.state, updated = excluded.updated",
+                    upserts,
+                )
+                self.db.executemany("DELETE FROM sessions WHERE sid = ?", deletes)
+                self.db.execute("DELETE FROM used_nonces WHERE expires <= ?", (now,))
+                self.db.execute("COMMIT")
+            except sqlite3.Error:
+                self.db.execute("ROLLBACK")
+                # Put the batch back (newer saves win) so it's retried next time
+                with self.lock:
+                    batch.update(self.pending)
+                    self.pending = batch
+                raise
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except sqlite3.Error:
+                pass  # kept pending, retried on the next tick
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+        self.flush()
+        with self.db_lock:
+            self.db.close()
+
+
+def make_store(spec=None):
+    """
+    Builds the store named by `spec` or $XIBALBA_SESSION_STORE ("memory" or
+    "sqlite:<path>"). Shared backends need XIBALBA_WIN_SECRET: with a random
+    secret per process, a game resumed by another process (or after a
+    restart) would get a nonce that process can't check codes for.
+    """
+    spec = spec or os.environ.get("XIBALBA_SESSION_STORE", "memory")
+    if spec == "memory":
+        return MemoryStore()
+    if not spec.startswith("sqlite:"):
+        raise ValueError(f"unknown session store '{spec}' (use 'memory' or 'sqlite:<path>')")
+    if not os.environ.get(SECRET_ENV):
+        raise ValueError(f"session store '{spec}' is shared between processes; set {SECRET_ENV} too")
+    return SQLiteStore(spec.split(":", 1)[1] or "sessions.db")
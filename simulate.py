@@ -0,0 +1,243 @@
+"""
+Headless playthroughs of the story graph.
+
+Plays scenes.json many times with no I/O or sleeps, picking choices with a
+policy, and reports how the story plays out: where players die, how long
+runs last and how the ball game scores are spread. Useful for balancing
+content and for checking the story still works after editing scenes.json.
+
+    python simulate.py --runs 1000000 --policy random --workers 0
+    python simulate.py --runs 10000 --policy dev --json
+"""
+import argparse
+import json
+import multiprocessing
+import random
+import sys
+import time
+from collections import Counter
+
+from scene_graph import load_scene_graph
+
+
+#####################
+# Policies
+#####################
+#
+# A policy gets (scene, keys, rng) and returns one of `keys`. `keys` are the
+# scene's choice keys (or the shot keys on the ball court), in file order.
+
+def random_policy(scene, keys, rng):
+    """Picks uniformly at random, like a player guessing."""
+    return keys[rng.randrange(len(keys))]
+
+
+def dev_policy(scene, keys, rng):
+    """Always picks what DEV MODE picks in terminal-based.py (the 2nd option)."""
+    return keys[1] if len(keys) > 1 else keys[0]
+
+
+def skilled_policy(skill):
+    """Picks the DEV MODE answer with probability `skill`, otherwise guesses."""
+    def policy(scene, keys, rng):
+        if rng.random() < skill:
+            return dev_policy(scene, keys, rng)
+        return random_policy(scene, keys, rng)
+    return policy
+
+
+POLICIES = {
+    "random": random_policy,
+    "dev": dev_policy,
+}
+
+
+def make_policy(name):
+    """The policy for a --policy value. ValueError if there is none by that name."""
+    if name.startswith("skill:"):
+        try:
+            skill = float(name.split(":", 1)[1])
+        except ValueError:
+            skill = None
+        # (also rejects nan)
+        if skill is None or not 0.0 <= skill <= 1.0:
+            raise ValueError(f"bad policy '{name}': the skill must be a number from 0 to 1")
+        return skilled_policy(skill)
+    if name not in POLICIES:
+        raise ValueError(f"unknown policy '{name}'")
+    return POLICIES[name]
+
+
+#####################
+# Simulation
+#####################
+
+class Stats:
+    """Counters gathered over many playthroughs. Mergeable across workers."""
+
+    def __init__(self):
+        self.runs = 0
+        self.endings = Counter()       # "victory" / "game_over"
+        self.visits = Counter()        # scene -> times entered
+        self.deaths = Counter()        # scene -> times it killed the player
+        self.path_lengths = Counter()  # scenes visited -> runs
+        self.ball_scores = Counter()   # ball game score -> runs
+
+    def merge(self, other):
+        self.runs += other.runs
+        self.endings.update(other.endings)
+        self.visits.update(other.visits)
+        self.deaths.update(other.deaths)
+        self.path_lengths.update(other.path_lengths)
+        self.ball_scores.update(other.ball_scores)
+        return self
+
+    def to_dict(self):
+        return {
+            "runs": self.runs,
+            "endings": dict(self.endings),
+            "death_rate": {
+                scene: self.deaths[scene] / self.visits[scene]
+                for scene in self.visits if self.visits[scene]
+            },
+            "visits": dict(self.visits),
+            "deaths": dict(self.deaths),
+            "path_lengths": {str(k): v for k, v in sorted(self.path_lengths.items())},
+            "ball_scores": {str(k): v for k, v in sorted(self.ball_scores.items())},
+        }
+
+
+def play_once(graph, policy, rng, stats):
+    """One run from the start scene to victory or the first game over."""
+    scene = graph[graph.start_scene]
+    length = 0
+
+    while True:
+        stats.visits[scene.id] += 1
+        length += 1
+
+        if scene.kind in ("ending", "game_over"):
+            stats.endings["victory" if scene.kind == "ending" else "game_over"] += 1
+            break
+
+        if scene.kind == "ballgame":
+            shot_keys = tuple(scene.shot_options)
+            score = 0
+            for _ in range(scene.rounds):
+                if scene.shot_for_key[policy(scene, shot_keys, rng)].scores:
+                    score += 1
+            stats.ball_scores[score] += 1
+            key = "win" if score >= scene.min_score else "lose"
+        else:
+            key = policy(scene, tuple(scene.options), rng)
+
+        transition = graph.transition(scene.id, key)
+        if transition.next is None:
+            break
+        if transition.next == "game_over":
+            stats.deaths[scene.id] += 1
+        scene = graph[transition.next]
+
+    stats.path_lengths[length] += 1
+    stats.runs += 1
+
+
+def simulate(runs, policy_name="random", seed=None, graph=None):
+    """Plays `runs` playthroughs in this process and returns their Stats."""
+    graph = graph or load_scene_graph()
+    policy = make_policy(policy_name)
+    rng = random.Random(seed)
+    stats = Stats()
+    for _ in range(runs):
+        play_once(graph, policy, rng, stats)
+    return stats
+
+
+def _worker(job):
+    runs, policy_name, seed = job
+    return simulate(runs, policy_name, seed)
+
+
+def simulate_parallel(runs, policy_name="random", seed=None, workers=None):
+    """Splits the runs over a process pool (one process per core by default)."""
+    workers = workers or multiprocessing.cpu_count()
+    base_seed = random.Random(seed).getrandbits(32)
+    chunk, extra = divmod(runs, workers)
+    jobs = [(chunk + (1 if i < extra else 0), policy_name, base_seed + i) for i in range(workers)]
+
+    stats = Stats()
+    with multiprocessing.Pool(workers) as pool:
+        for part in pool.imap_unordered(_worker, [job for job in jobs if job[0]]):
+            stats.merge(part)
+    return stats
+
+
+#####################
+# Report
+#####################
+
+def histogram(counter, total, width=40):
+    lines = []
+    for key in sorted(counter):
+        share = counter[key] / total if total else 0
+        lines.append(f"  {key:>4} | {'#' * round(share * width):<{width}} {share:6.1%}  ({counter[key]})")
+    return "\n".join(lines)
+
+
+def print_report(stats, graph, elapsed):
+    rate = stats.runs / elapsed if elapsed else float("inf")
+    print(f"{stats.runs} playthroughs in {elapsed:.2f}s ({rate:,.0f}/s)")
+    print()
+    for ending, count in stats.endings.most_common():
+        print(f"  {ending:10} {count / stats.runs:6.1%}")
+
+    print("\nDeath rate per scene (deaths / visits):")
+    for scene_id in graph.scenes:
+        visits = stats.visits[scene_id]
+        if visits and graph[scene_id].kind not in ("ending", "game_over"):
+            print(f"  {scene_id:18} {stats.deaths[scene_id] / visits:6.1%}  of {visits}")
+
+    print("\nPath length (scenes visited):")
+    print(histogram(stats.path_lengths, stats.runs))
+
+    played = sum(stats.ball_scores.values())
+    if played:
+        print(f"\nBall game score ({played} games):")
+        print(histogram(stats.ball_scores, played))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless playthroughs of scenes.json")
+    parser.add_argument("--runs", type=int, default=100000)
+    parser.add_argument("--policy", default="random",
+                        help="random, dev, or skill:<0..1> (dev answer with that probability)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="processes to use; 0 means one per CPU core")
+    parser.add_argument("--json", action="store_true", help="print the stats as JSON")
+    args = parser.parse_args(argv)
+
+    try:
+        make_policy(args.policy)
+    except ValueError as exc:
+        parser.error(str(exc))
+    if args.workers < 0:
+        parser.error("--workers must be 0 (one per core) or more")
+
+    graph = load_scene_graph()
+    began = time.perf_counter()
+    if args.workers == 1:
+        stats = simulate(args.runs, args.policy, args.seed, graph)
+    else:
+        stats = simulate_parallel(args.runs, args.policy, args.seed, args.workers or None)
+    elapsed = time.perf_counter() - began
+
+    if args.json:
+        json.dump(stats.to_dict(), sys.stdout, indent=2)
+        print()
+    else:
+        print_report(stats, graph, elapsed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Sound effects for MiniGame.
+
+Creating a pygame.mixer.Sound from a file decodes the whole file, which takes
+milliseconds for a short MP3 and over 100 ms for a long one. Doing that where
+a hit happens would stall the frame. So SoundBank decodes (or synthesizes)
+every effect once at startup, and play() only hands a ready buffer to a
+mixer channel.
+
+Effects play on a fixed pool of channels. When every channel is busy, a new
+sound steals the channel with the least important, oldest sound; if all of
+them are more important than the new one, it's dropped instead.
+
+The mixer is opened with a small buffer (BUFFER_SAMPLES), since a sound can't
+start before the buffer being played runs out: 256 samples at 44.1 kHz is
+about 6 ms, less than a frame at 144 fps. stats() reports that figure along
+with how long play() calls take, and how often voices were stolen or dropped.
+pygame doesn't say what buffer the device really got, so the figure is the
+size init_mixer asked for at the rate the mixer opened with, and unknown if
+something else opened the mixer first.
+
+Without an audio device (or with enabled=False) every call is a no-op, so the
+game runs the same, just silent.
+"""
+import time
+from collections import deque
+
+import numpy as np
+import pygame
+
+FREQUENCY = 44100
+BUFFER_SAMPLES = 256
+VOICES = 8
+
+# The buffer size init_mixer opened the mixer with; None if it didn't
+opened_buffer = None
+
+
+def init_mixer(frequency=FREQUENCY, buffer=BUFFER_SAMPLES):
+    """Opens the audio device. False if there is none."""
+    global opened_buffer
+    if pygame.mixer.get_init() is not None:
+        return True   # already open, with a buffer we can't know
+    # allowedchanges=0: let SDL convert to exactly this format, so synthesized
+    # buffers can be built as 16-bit stereo without asking
+    pygame.mixer.pre_init(frequency, -16, 2, buffer, allowedchanges=0)
+    try:
+        pygame.mixer.init()
+    except pygame.error:
+        return False
+    opened_buffer = buffer
+    return True
+
+
+def envelope_tone(freqs, seconds, decay, frequency=FREQUENCY, noise=0.0, seed=0):
+    """
+    A short synthesized sound: sine waves at `freqs` (played one after
+    another, evenly split), plus optional noise, with an exponential fade.
+    Returns 16-bit stereo samples.
+    """
+    n = max(1, int(seconds * frequency))
+    t = np.arange(n) / frequency
+    part = np.minimum((np.arange(n) * len(freqs)) // n, len(freqs) - 1)
+    wave = np.sin(2 * np.pi * np.asarray(freqs, dtype=float)[part] * t)
+    if noise:
+        wave = (1 - noise) * wave + noise * np.random.default_rng(seed).uniform(-1, 1, n)
+    wave *= np.exp(-t * decay)
+    mono = (wave * 0.8 * 32767).astype(np.int16)
+    return np.column_stack((mono, mono))
+
+
+class SoundBank:
+    """Preloaded effects on a fixed pool of mixer channels."""
+
+    def __init__(self, voices=VOICES, enabled=True):
+        self.enabled = enabled and pygame.mixer.get_init() is not None
+        self.sounds = {}                       # name -> (Sound, priority, max_ms)
+        self.channels = []
+        if self.enabled:
+            pygame.mixer.set_num_channels(voices)
+            pygame.mixer.set_reserved(voices)  # only play() picks channels
+            self.channels = [pygame.mixer.Channel(i) for i in range(voices)]
+        self.started = [0.0] * len(self.channels)
+        self.priority = [0] * len(self.channels)
+        self.play_times = deque(maxlen=512)    # seconds spent in play()
+        self.played = 0
+        self.stolen = 0
+        self.dropped = 0
+
+    def load(self, name, path, priority=0, volume=1.0, max_seconds=0):
+        """Decodes a sound file now. Missing or unreadable files are skipped."""
+        if not self.enabled:
+            return
+        try:
+            sound = pygame.mixer.Sound(path)
+        except (pygame.error, FileNotFoundError):
+            return
+        sound.set_volume(volume)
+        self.sounds[name] = (sound, priority, int(max_seconds * 1000))
+
+    def add(self, name, samples, priority=0, volume=1.0):
+        """Adds synthesized 16-bit stereo samples (see envelope_tone)."""
+        if not self.enabled:
+            return
+        sound = pygame.sndarray.make_sound(np.ascontiguousarray(samples))
+        sound.set_volume(volume)
+        self.sounds[name] = (sound, priority, 0)
+
+    def play(self, name, volume=1.0):
+        if not self.enabled:
+            return
+        began = time.perf_counter()
+        entry = self.sounds.get(name)
+        if entry is None:
+            return
+        sound, priority, max_ms = entry
+
+        channels = self.channels
+        for i, channel in enumerate(channels):
+            if not channel.get_busy():
+                break
+        else:
+            # Everything is playing: take the least important, oldest voice
+            i = min(range(len(channels)), key=lambda c: (self.priority[c], self.started[c]))
+            if self.priority[i] > priority:
+                self.dropped += 1
+                return
+            self.stolen += 1
+            channel = channels[i]
+
+        channel.set_volume(volume)
+        channel.play(sound, maxtime=max_ms)
+        self.started[i] = began
+        self.priority[i] = priority
+        self.played += 1
+        self.play_times.append(time.perf_counter() - began)
+
+    def output_latency(self):
+        """
+        Seconds of audio in the buffer init_mixer requested: the wait before a
+        sound starts. None if unknown (see the module docstring).
+        """
+        init = pygame.mixer.get_init() if self.enabled else None
+        if init is None or opened_buffer is None:
+            return None
+        return opened_buffer / init[0]
+
+    def stats(self):
+        """{"buffer_ms" (None if unknown), "play_p50_ms", "play_p99_ms", "played", "stolen", "dropped"}"""
+        ms = np.array(self.play_times) * 1000 if self.play_times else np.zeros(1)
+        latency = self.output_latency()
+        return {
+            "buffer_ms": latency * 1000 if latency is not None else None,
+            "play_p50_ms": float(np.percentile(ms, 50)),
+            "play_p99_ms": float(np.percentile(ms, 99)),
+            "played": self.played,
+            "stolen": self.stolen,
+            "dropped": self.dropped,
+        }
+
+    def overlay_line(self):
+        if not self.enabled:
+            return "sound off"
+        s = self.stats()
+        buffer = f"{s['buffer_ms']:.1f} ms buffer (requested)" if s["buffer_ms"] is not None else "buffer unknown"
+        return (f"sound {buffer}  play p99 {s['play_p99_ms']:.3f} ms  "
+                f"stolen {s['stolen']} dropped {s['dropped']}")
@@ -1,10 +1,24 @@
-import base64
+import os
+import time
+
+# Start the clock before anything else so the rerun timing covers the whole script
+RUN_STARTED = time.perf_counter()
+
 import streamlit as st
 import random
-import time
-import os
+import functools
+import hashlib
+import json
+import secrets
+from collections import namedtuple
 import streamlit.components.v1 as components
 
+from media_cache import AssetCache, Prefetcher, publish_file
+from rerun_stats import RerunStats
+from scene_graph import load_scene_graph
+from session_store import FIELDS as SAVED_FIELDS, encode_state, make_store
+from win_codes import WinCodes, VALID, WRONG_SESSION, ALREADY_USED
+
 # Configure page settings for a better game feel
 st.set_page_config(
     page_title="Popol Vuh: The Ballgame",
@@ -12,45 +26,204 @@ st.set_page_config(
     layout="wide"
 )
 
+# Upper bound for encoded audio kept in memory by the shared media cache
+MEDIA_CACHE_MB = 64
+
+# How scene audio reaches the browser:
+#   "url"    - published to ./static and referenced by URL (needs
+#              server.enableStaticServing, see .streamlit/config.toml)
+#   "inline" - embedded as a base64 data URI on every rerun
+AUDIO_DELIVERY = "url"
+
+# Pixel width scene art is rendered at. The art sits in a 1/3-width column of
+# the wide layout, so this covers it on HiDPI screens too. The smallest
+# prebuilt variant at least this wide is sent instead of the original PNG.
+IMAGE_DISPLAY_WIDTH = 640
+
+# Threads that warm the media of the scenes a player can go to next (image
+# variants, published audio) while they read the current one.
+PREFETCH_WORKERS = 2
+
+# Server time we aim to stay under per interaction. Open the app with ?perf=1
+# to see how long reruns take (p50/p95/p99, shared by every session).
+RERUN_BUDGET_MS = 50
+
+# The ball court mini game. Published to ./static under its content hash and
+# shown as an iframe pointing at that URL, so the browser caches it and reruns
+# only send the URL. Without static serving it's sent inline instead.
+GAME_HTML = "game.html"
+GameComponent = namedtuple("GameComponent", "content_hash url html")
+
 #####################
 # Helper/Init functions
 #####################
 
+@st.cache_resource
+def get_asset_cache():
+    """One media cache per Streamlit process, shared by every session."""
+    cache = AssetCache(root=".", max_bytes=MEDIA_CACHE_MB * 1024 * 1024)
+    cache.index_all()
+    return cache
+
+@st.cache_resource
+def get_prefetcher():
+    """Background warming of the media cache, shared by every session."""
+    return Prefetcher(get_asset_cache(), workers=PREFETCH_WORKERS)
+
+@st.cache_resource
+def get_scene_graph():
+    """scenes.json is loaded and validated once per process."""
+    return load_scene_graph()
+
+@st.cache_resource
+def get_rerun_stats():
+    """Run timings for the whole process, so they show behaviour under load."""
+    return RerunStats(budget_ms=RERUN_BUDGET_MS)
+
+def timed_fragment(func):
+    """
+    st.fragment that also records its run time. Widgets inside a fragment only
+    rerun the fragment, so picking an answer doesn't redraw the scene or
+    re-send its media; st.rerun() from inside still reruns the whole app.
+    """
+    @functools.wraps(func)
+    def run(*args, **kwargs):
+        with get_rerun_stats().measure("fragment"):
+            return func(*args, **kwargs)
+    return st.fragment(run)
+
+def show_perf_panel():
+    """Rerun timings in the sidebar, when the page was opened with ?perf=1."""
+    if st.query_params.get("perf") != "1":
+        return
+    with st.sidebar.expander("⏱️ Server time per rerun", expanded=True):
+        stats = get_rerun_stats().summary()
+        if not stats:
+            st.caption("No runs measured yet.")
+        for kind, values in stats.items():
+            st.caption(
+                f"**{kind}** ({values['count']} runs): p50 {values['p50']:.1f} ms · "
+                f"p95 {values['p95']:.1f} ms · p99 {values['p99']:.1f} ms · "
+                f"{values['over_budget']:.0%} over {RERUN_BUDGET_MS} ms"
+            )
+
+@st.cache_resource(show_spinner=False)
+def load_game_component(mtime_ns):
+    """
+    Reads game.html once per process (and again only when its mtime changes,
+    which is part of the cache key) and publishes it to ./static.
+    """
+    if st.get_option("server.enableStaticServing"):
+        content_hash, url = publish_file(GAME_HTML, prefix="game-")
+        return GameComponent(content_hash, url, None)
+    with open(GAME_HTML, "r", encoding="utf-8") as f:
+        html = f.read()
+    return GameComponent(hashlib.sha1(html.encode("utf-8")).hexdigest()[:16], None, html)
+
+@st.cache_resource
+def get_win_codes():
+    """Signs and checks ball court win codes; spent ones are remembered in the session store."""
+    return WinCodes(used=get_session_store())
+
+def session_win_nonce():
+    """This session's win code nonce, made on first use and after each redeemed code."""
+    if "win_nonce" not in st.session_state:
+        st.session_state.win_nonce = get_win_codes().new_nonce()
+    return st.session_state.win_nonce
+
+def get_game_component():
+    """The cached game, or None if game.html is missing."""
+    try:
+        return load_game_component(os.stat(GAME_HTML).st_mtime_ns)
+    except FileNotFoundError:
+        return None
+
+def audio_served_by_url():
+    """URL delivery only works when Streamlit serves the ./static folder."""
+    return AUDIO_DELIVERY == "url" and st.get_option("server.enableStaticServing")
+
 def render_scene_media(scene_name, container=st):
     """
     Checks for a folder named after the scene and renders media files 
     into the specified container (e.g., a column).
     """
-    if os.path.exists(scene_name) and os.path.isdir(scene_name):
-        # Get all files in the directory
-        files = sorted(os.listdir(scene_name))
-        
-        for file in files:
-            file_path = os.path.join(scene_name, file)
-            
-            # Check extensions and render accordingly
-            if file.lower().endswith(('.png', '.jpg', '.jpeg', '.gif')):
-                container.image(file_path, use_container_width=True)
-            elif file.lower().endswith(('.mp4', '.mov', '.webm')):
-                container.video(file_path)
-            elif file.lower().endswith(('.mp3', '.wav', '.ogg')):
-                # Read audio file and convert to base64
-                with open(file_path, 'rb') as audio_file:
-                    audio_bytes = audio_file.read()
-                    audio_base64 = base64.b64encode(audio_bytes).decode()
-    
-                # Determine MIME type
-                ext = file.lower().split('.')[-1]
-                mime_types = {'mp3': 'audio/mpeg', 'wav': 'audio/wav', 'ogg': 'audio/ogg'}
-                mime = mime_types.get(ext, 'audio/mpeg')
-    
-                # Inject hidden autoplay audio
-                audio_html = f"""
-                    <audio autoplay style="display:none;">
-                        <source src="data:{mime};base64,{audio_base64}" type="{mime}">
-                    </audio>
-                """
-                st.markdown(audio_html, unsafe_allow_html=True)
+    cache = get_asset_cache()
+
+    for media in cache.scene_files(scene_name):
+        if media.kind == "image":
+            container.image(cache.image_path(media, IMAGE_DISPLAY_WIDTH), use_container_width=True)
+        elif media.kind == "video":
+            container.video(media.path)
+        elif media.kind == "audio":
+            if audio_served_by_url():
+                src = cache.publish_static(media)
+            else:
+                src = f"data:{media.mime};base64,{cache.base64_payload(media)}"
+
+            # Inject hidden autoplay audio
+            audio_html = f"""
+                <audio autoplay style="display:none;">
+                    <source src="{src}" type="{media.mime}">
+                </audio>
+            """
+            st.markdown(audio_html, unsafe_allow_html=True)
+
+def prefetch_next_scenes(scene):
+    """
+    Warms the media of every scene reachable from `scene` in the background,
+    and has the browser start downloading their audio, so the next
+    transition doesn't wait on the disk or the network.
+    """
+    upcoming = [name for name in get_scene_graph().successors(scene.id) if name != scene.id]
+    audio_url = audio_served_by_url()
+    get_prefetcher().prefetch(upcoming, IMAGE_DISPLAY_WIDTH, audio_url)
+
+    # Inline audio would have to be sent twice, so only URLs get a hint. And
+    # only for files the prefetcher already published: hashing and copying
+    # them here would hold up this rerun (the hints show up on the next one)
+    if not audio_url:
+        return
+    cache = get_asset_cache()
+    urls = (
+        cache.published_url(media)
+        for name in upcoming
+        for media in cache.known_files(name)
+        if media.kind == "audio"
+    )
+    hints = [f'<audio preload="auto" style="display:none;" src="{url}"></audio>' for url in urls if url]
+    if hints:
+        st.markdown("".join(hints), unsafe_allow_html=True)
+
+@st.cache_resource
+def get_session_store():
+    """Where progress is saved: XIBALBA_SESSION_STORE, in-process memory by default."""
+    return make_store()
+
+def restore_session():
+    """
+    Once per browser session: picks up the saved game for ?sid=... if there is
+    one, and puts the session id in the URL so reloading or reconnecting
+    resumes from here. The sid is a bearer token: anyone with the URL can
+    play on this game.
+    """
+    if "sid" in st.session_state:
+        return
+    sid = st.query_params.get("sid") or secrets.token_urlsafe(12)
+    saved = get_session_store().load(sid)
+    if saved:
+        st.session_state.update(saved)
+    st.session_state.sid = sid
+    st.query_params["sid"] = sid
+
+def save_session():
+    """Saves the progress fields after a run, skipping the write when nothing changed."""
+    if "sid" not in st.session_state:
+        return
+    state = {field: st.session_state.get(field) for field in SAVED_FIELDS}
+    encoded = encode_state(state)
+    if st.session_state.get("saved_state") != encoded:
+        get_session_store().save(st.session_state.sid, state)
+        st.session_state.saved_state = encoded
 
 def initialize_state():
     if "scene" not in st.session_state:
@@ -65,6 +238,7 @@ def initialize_state():
         st.session_state.game_over_reason = ""
 
 def reset_for_restart():
+    st.session_state.pop("win_nonce", None)
     st.session_state.inventory = []
     st.session_state.score = 0
     st.session_state.rounds = 0
@@ -96,7 +270,26 @@ def show_hud():
 # Scenes
 #####################
 
-def start():
+def render_text(blocks):
+    """Renders [style, text] blocks from scenes.json (st.write, st.info, ...)."""
+    for style, text in blocks:
+        getattr(st, style)(text)
+
+def take_transition(scene, key):
+    """Applies a choice from the scene graph and moves to the next scene."""
+    transition = get_scene_graph().transition(scene.id, key)
+
+    if transition.gain:
+        st.session_state.inventory.append(transition.gain)
+    if transition.toast:
+        st.toast(transition.toast)
+    if transition.next == "game_over":
+        st.session_state.game_over_reason = transition.web_reason
+
+    st.session_state.scene = transition.next or get_scene_graph().start_scene
+    st.rerun()
+
+def start(scene):
     # Layout: Text Left (2), Image Right (1)
     col1, col2 = st.columns([2, 1])
     
@@ -105,193 +298,47 @@ def start():
         st.markdown("<h3>The Ballgame of the Gods</h3>", unsafe_allow_html=True)
         st.divider()
 
-        st.info("Many years ago, the First Twins played ball too loudly. The Lords of Xibalbadefeated them.")
-        st.write("Now, **YOU** are the New Twins: **Hunahpu** and **Xbalanque**.")
-        st.write("You have accepted the challenge to restore honor to your family.")
+        render_text(scene.web_text)
 
         st.write("")
-        if st.button("Begin Adventure", type="primary", use_container_width=True):
-            st.session_state.scene = "crossroads"
-            st.rerun()
-
-    with col2:
-        render_scene_media("start", container=col2)
-
-def crossroads():
-    st.progress(10, text="The Journey Begins")
-    st.header("The Crossroads")
-    
-    col1, col2 = st.columns([2, 1])
-    
-    with col1:
-        st.write("You descend deep into the earth. You arrive at four paths: Red, White, Yellow, and Black.")
-        st.write("The Lords are hiding. A mosquito named **Xan** buzzes near your ear.")
-
-        options = {
-            "1": "Walk the Black Path alone",
-            "2": "Send Xan the Mosquito ahead to scout",
-            "3": "Walk the White Path alone",
-            "4": "Walk the Yellow Path alone",
-            "5": "Walk the Red Path alone"
-        }
-
-        items = list(options.items())
-        display_values = [desc for key, desc in items]
-
-        choice = st.radio("What will you do?", display_values)
-
-        if st.button("Make Choice", type="primary"):
-            selected_key = next(key for key, desc in items if desc == choice)
-
-            if selected_key == "1":
-                st.session_state.game_over_reason = "You walked into the dark. The Lords tricked you immediately!"
-                st.session_state.scene = "game_over"
-                st.rerun()
-            elif selected_key == "2":
-                st.toast("Success! Xan helped you.")
-                st.session_state.inventory.append("Secret Names")
-                st.session_state.scene = "throne_room"
-                st.rerun()
-            else:
-                st.session_state.game_over_reason = "You took the wrong path and got lost forever."
-                st.session_state.scene = "game_over"
-                st.rerun()
-                
-    with col2:
-        render_scene_media("crossroads", container=col2)
-
-def throne_room():
-    st.progress(25, text="The Greeting")
-    st.header("The Throne Room")
-    
-    col1, col2 = st.columns([2, 1])
-
-    with col1:
-        st.write("You enter the court knowing the Lords' names. They look surprised, but smile wickedly.")
-        st.warning("They point to a large, beautiful stone bench. 'Welcome, Twins! Please, rest on our throne of honor.'")
-
-        options = {"1": "Sit on the Throne", "2": "Sit on the Floor"}
-        items = list(options.items())
-        display_values = [desc for key, desc in items]
-
-        choice = st.radio("Where will you sit?", display_values)
-
-        if st.button("Confirm"):
-            selected_key = next(key for key, desc in items if desc == choice)
-
-            if selected_key == "1":
-                st.session_state.game_over_reason = "The stone was boiling hot! You were burned."
-                st.session_state.scene = "game_over"
-                st.rerun()
-            else:
-                st.toast("Wise choice.")
-                st.session_state.scene = "house_of_gloom"
-                st.rerun()
-
-    with col2:
-        render_scene_media("throne_room", container=col2)
-
-def house_of_gloom():
-    st.progress(40, text="House of Gloom")
-    st.header("The House of Gloom")
-    
-    col1, col2 = st.columns([2, 1])
-
-    with col1:
-        st.write("The Lords hand you a lit torch and a cigar.")
-        st.info("'Keep this light burning all night,' they say. 'But return it tomorrow UNUSED.'")
-        st.write("It is a paradox. How do you keep fire without burning the wood?")
-
-        options = {"1": "Let the torch burn normally", "2": "Swap flame for red Macaw feathers"}
-        items = list(options.items())
-        display_values = [desc for key, desc in items]
-
-        choice = st.radio("Solution:", display_values)
-
-        if st.button("Proceed"):
-            selected_key = next(key for key, desc in items if desc == choice)
-            if selected_key == "1":
-                st.session_state.game_over_reason = "The torch turned to ash. The Lords executed you."
-                st.session_state.scene = "game_over"
-                st.rerun()
-            else:
-                st.toast("Brilliant trickery!")
-                st.session_state.scene = "house_of_cold"
-                st.rerun()
+        begin = scene.choices[0]
+        if st.button(begin.label, type="primary", use_container_width=True):
+            take_transition(scene, begin.key)
 
     with col2:
-        render_scene_media("house_of_gloom", container=col2)
+        render_scene_media(scene.id, container=col2)
 
-def house_of_cold():
-    st.progress(55, text="House of Cold")
-    st.header("The House of Cold")
+def choice_scene(scene):
+    """Any story scene: narration, a radio question and a confirm button."""
+    if scene.progress is not None:
+        st.progress(scene.progress, text=scene.progress_text)
+    st.header(scene.title)
     
     col1, col2 = st.columns([2, 1])
 
     with col1:
-        st.write("It is freezing! Thick ice coats the walls and hail falls constantly.")
-        st.write("You cannot sleep or you will freeze.")
-
-        options = {"1": "Huddle together", "2": "Burn old pinecones"}
-        items = list(options.items())
-        display_values = [desc for key, desc in items]
-
-        choice = st.radio("Survival Strategy:", display_values)
-
-        if st.button("Act"):
-            selected_key = next(key for key, desc in items if desc == choice)
-            if selected_key == "1":
-                st.session_state.game_over_reason = "Body heat wasn't enough. You froze solid."
-                st.session_state.scene = "game_over"
-                st.rerun()
-            else:
-                st.toast("The fire saved you.")
-                st.session_state.scene = "house_of_jaguars"
-                st.rerun()
+        render_text(scene.web_text)
+        choice_controls(scene)
 
     with col2:
-        render_scene_media("house_of_cold", container=col2)
-
-def house_of_jaguars():
-    st.progress(70, text="House of Jaguars")
-    st.header("The House of Jaguars")
-    
-    col1, col2 = st.columns([2, 1])
-
-    with col1:
-        st.error("The Lords throw you into a room filled with hungry Jaguars! They circle you.")
-
-        options = {"1": "Fight with knife", "2": "Distract with bones"}
-        items = list(options.items())
-        display_values = [desc for key, desc in items]
-
-        choice = st.radio("Action:", display_values)
+        render_scene_media(scene.id, container=col2)
 
-        if st.button("Execute"):
-            selected_key = next(key for key, desc in items if desc == choice)
-            if selected_key == "1":
-                st.session_state.game_over_reason = "There were too many jaguars to fight."
-                st.session_state.scene = "game_over"
-                st.rerun()
-            else:
-                st.toast("The jaguars are happy with the bones.")
-                st.session_state.scene = "ballgame"
-                st.rerun()
+@timed_fragment
+def choice_controls(scene):
+    choice = st.radio(scene.prompt, scene.labels)
 
-    with col2:
-        render_scene_media("house_of_jaguars", container=col2)
+    if st.button(scene.button, type="primary" if scene.primary else "secondary"):
+        take_transition(scene, scene.key_for_label[choice])
 
-def ballgame():
-    st.header("THE TLACHTLI COURT")
+def ballgame(scene):
+    st.header(scene.title)
     
     # Game is wide, so we use equal columns or give the game more space if needed.
     # Using [1, 1.5] to give the visual game a bit more room on the right.
     col1, col2 = st.columns([1, 1.5])
 
     with col1:
-        st.write("The Lords of Xibalba sneer at you.")
-        st.write("'We will not play with mere words,' they shout.")
-        st.warning("'Prove your skill on the VISUAL COURT!'")
+        render_text(scene.web_text)
 
         st.markdown("""
         **INSTRUCTIONS:**
@@ -302,131 +349,134 @@ def ballgame():
         """)
         
         st.write("---")
-        code_input = st.text_input("Enter the SACRED CODE here:")
-
-        if st.button("Verify Sacred Code"):
-            if not code_input:
-                st.warning("You must enter a code.")
-            elif code_input.startswith("TLACHTLI") and "P1" in code_input:
-                st.balloons()
-                st.success(f"ACCEPTED: {code_input}")
-                st.write("The Lords recoil in shock! You have defeated them on the court!")
-                time.sleep(2)
-                st.session_state.scene = "finale"
-                st.rerun()
-            elif "P2" in code_input:
-                st.error("The code turns red and crumbles. The Lords defeated you.")
-                st.session_state.death_reason = "Lost the ballgame."
-                st.session_state.scene = "game_over"
-                st.rerun()
-            else:
-                st.error("The Lords laugh. 'That is not a valid code!'")
+        code_entry(scene)
 
     with col2:
         # Load and Display the HTML Game (Iframe)
         # We also check for any static media in the ballgame folder
-        render_scene_media("ballgame", container=col2)
-        
-        try:
-            with open("game.html", "r", encoding="utf-8") as f:
-                html_code = f.read()
-            components.html(html_code, height=600, width=None, scrolling=False)
-        except FileNotFoundError:
-            st.error("Error: 'game.html' not found.")
-
-def finale():
-    st.progress(95, text="The Grand Trick")
-    st.header("The Grand Trick")
-    
-    col1, col2 = st.columns([2, 1])
-
-    with col1:
-        st.write("You perform miracles, bringing things back to life. The Lords are amazed.")
-        st.info("'Burn us!' they command. 'Make us young again!'")
-
-        options = {"1": "Burn them and REVIVE them", "2": "Burn them and DO NOT revive them"}
-        items = list(options.items())
-        display_values = [desc for key, desc in items]
-
-        choice = st.radio("The Final Decision:", display_values)
+        render_scene_media(scene.id, container=col2)
 
-        if st.button("Cast the Spell"):
-            selected_key = next(key for key, desc in items if desc == choice)
-            if selected_key == "1":
-                st.session_state.game_over_reason = "You revived the evil Lords. They ate you."
-                st.session_state.scene = "game_over"
-                st.rerun()
-            else:
-                st.session_state.scene = "victory"
-                st.rerun()
+        # The game signs its win code with this session's key (see win_codes.py).
+        # In the URL fragment it never reaches the server, and the cached file
+        # stays the same for everyone.
+        nonce = session_win_nonce()
+        win_params = {"nonce": nonce, "key": get_win_codes().session_key(nonce)}
 
-    with col2:
-        render_scene_media("finale", container=col2)
+        game = get_game_component()
+        if game is None:
+            st.error("Error: 'game.html' not found.")
+        elif game.url:
+            fragment = "&".join(f"{k}={v}" for k, v in win_params.items())
+            components.iframe(f"{game.url}#{fragment}", height=600, scrolling=False)
+        else:
+            params_js = f"<script>window.WIN_PARAMS = {json.dumps(win_params)};</script>"
+            components.html(params_js + game.html, height=600, width=None, scrolling=False)
+
+@timed_fragment
+def code_entry(scene):
+    if st.session_state.pop("code_spent", False):
+        st.error("The Lords laugh. 'That code has already been spent!'")
+
+    code_input = st.text_input("Enter the SACRED CODE here:")
+
+    if st.button("Verify Sacred Code"):
+        if not code_input:
+            st.warning("You must enter a code.")
+            return
+
+        result, side = get_win_codes().verify(code_input, st.session_state.get("win_nonce"))
+        if result == VALID:
+            st.session_state.pop("win_nonce", None)
+        if result == ALREADY_USED:
+            # This session's nonce is spent, maybe by a restored session whose
+            # last save was lost. Drop it, save that right away and rerun the
+            # whole page (not just this fragment), so the court gets a fresh
+            # nonce and key
+            st.session_state.pop("win_nonce", None)
+            st.session_state.code_spent = True
+            save_session()
+            st.rerun()
+        if result == VALID and side == "P1":
+            st.balloons()
+            st.success(f"ACCEPTED: {code_input}")
+            st.write("The Lords recoil in shock! You have defeated them on the court!")
+            time.sleep(2)
+            take_transition(scene, "win")
+        elif result == VALID:
+            st.error("The code turns red and crumbles. The Lords defeated you.")
+            take_transition(scene, "lose")
+        elif result == WRONG_SESSION:
+            st.error("The Lords laugh. 'That code was won in someone else's game!'")
+        else:
+            st.error("The Lords laugh. 'That is not a valid code!'")
 
-def victory():
+def victory(scene):
     col1, col2 = st.columns([2, 1])
     
     with col1:
         st.balloons()
         st.markdown("<h1 style='text-align: left; color: gold;'>VICTORY!</h1>", unsafe_allow_html=True)
         st.divider()
-        st.write("The Lords turn to ash and blow away in the wind. Xibalba isdefeated.")
-        st.success("Hunahpu and Xbalanque rise into the sky to become the SUN and the MOON.")
+        render_text(scene.web_text)
 
-        if st.button("Play Again", type="primary"):
+        again = scene.choices[0]
+        if st.button(again.label, type="primary"):
             reset_for_restart()
-            st.session_state.scene = "start"
-            st.rerun()
+            take_transition(scene, again.key)
 
     with col2:
-        render_scene_media("victory", container=col2)
+        render_scene_media(scene.id, container=col2)
 
-def game_over():
+def game_over(scene):
     col1, col2 = st.columns([2, 1])
     
     with col1:
         st.markdown("<h1 style='text-align: left; color: red;'>GAME OVER</h1>", unsafe_allow_html=True)
         st.error(f"**Fate:** {st.session_state.get('game_over_reason', 'Unknown')}")
 
-        if st.button("Try Again", type="primary", use_container_width=True):
+        retry = scene.choices[0]
+        if st.button(retry.label, type="primary", use_container_width=True):
             reset_for_restart()
-            st.session_state.scene = "start"
-            st.rerun()
+            take_transition(scene, retry.key)
 
     with col2:
-        render_scene_media("game_over", container=col2)
+        render_scene_media(scene.id, container=col2)
+
+# Scene kind -> renderer
+SCENE_RENDERERS = {
+    "intro": start,
+    "choice": choice_scene,
+    "ballgame": ballgame,
+    "ending": victory,
+    "game_over": game_over,
+}
 
 #####################
 # MAIN APP LOGIC
 #####################
 
-initialize_state()
-
-# Show HUD on all screens except Start and Game Over
-if st.session_state.scene not in ["start", "game_over", "victory"]:
-    show_hud()
-
-# Scene Router
-if st.session_state.scene == "start":
-    start()
-elif st.session_state.scene == "crossroads":
-    crossroads()
-elif st.session_state.scene == "throne_room":
-    throne_room()
-elif st.session_state.scene == "house_of_gloom":
-    house_of_gloom()
-elif st.session_state.scene == "house_of_cold":
-    house_of_cold()
-elif st.session_state.scene == "house_of_jaguars":
-    house_of_jaguars()
-elif st.session_state.scene == "ballgame":
-    ballgame()
-elif st.session_state.scene == "finale":
-    finale()
-elif st.session_state.scene == "victory":
-    victory()
-elif st.session_state.scene == "game_over":
-    game_over()
-else:
-    st.session_state.scene = "start"
-    st.rerun()
+def main():
+    restore_session()
+    initialize_state()
+    graph = get_scene_graph()
+    show_perf_panel()
+
+    # Scene Router
+    if st.session_state.scene in graph:
+        current = graph[st.session_state.scene]
+
+        # Show HUD on all screens except Start, Victory and Game Over
+        if current.kind not in ("intro", "ending", "game_over"):
+            show_hud()
+
+        SCENE_RENDERERS[current.kind](current)
+        prefetch_next_scenes(current)
+    else:
+        st.session_state.scene = graph.start_scene
+        st.rerun()
+
+try:
+    main()
+finally:
+    save_session()
+    get_rerun_stats().record("app", time.perf_counter() - RUN_STARTED)
@@ -1,79 +1,438 @@
+import argparse
+import asyncio
 import time
 import os
 import sys
 import random
+import select
+import shutil
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
 
-# Global variable to track items collected
-inventory = []
+from scene_graph import load_scene_graph
+from screen import AnsiScreen, make_screen
 
-# Global variable for development mode
-DEV_MODE = False 
+# The whole story (scenes, choices, outcomes) lives in scenes.json
+GRAPH = load_scene_graph()
+
+# Typing this at the first prompt turns on dev mode
 dev_key = "dev"
 
-# Global text speed
+# Default text speed for a new game
 TEXT_SPEED = 0.003
 
+# How many times per second print_slow() draws the next chunk of text
+TYPEWRITER_FPS = 30
 
-def clear_screen():
-    """Clears the console screen for a fresh view."""
-    os.system('cls' if os.name == 'nt' else 'clear')
+# Server mode (python terminal-based.py --serve)
+SERVER_PORT = 2323
+CLIENT_SIZE = (80, 24)         # telnet window size (cols, rows) if the client won't say
+NAWS_WAIT = 0.5                # seconds to wait for a client to report its window size
+MAX_CLIENT_SIZE = (500, 200)
+IDLE_TIMEOUT = 5 * 60          # seconds a player may sit at a prompt
+SESSION_TIMEOUT = 2 * 60 * 60  # hard cap on one connection
+MAX_SESSIONS = 500
 
 
-def choose_speed():
-    """Ask the user for the text speed every game start."""
-    global TEXT_SPEED
+# --- SESSIONS ---
+#
+# Everything that used to be a global (inventory, dev mode, text speed) lives
+# on a GameSession, so one process can run many games side by side. The
+# scenes only talk to the player through the session's I/O methods.
+#
+# Output goes into the session's screen model (see screen.py) and only the
+# cells that changed are sent when the session flushes.
+
+class SessionClosed(Exception):
+    """The player went away: end of input, disconnect or idle timeout."""
+
+
+class GameSession(ABC):
+    """One player's game state plus the I/O the scenes use."""
+
+    def __init__(self, screen):
+        self.inventory = []
+        self.dev_mode = False
+        self.text_speed = TEXT_SPEED
+        self.screen = screen
+
+    def print(self, text="", end="\n"):
+        self.write(f"{text}{end}")
+
+    def write(self, text):
+        self.screen.write(text)
 
-    print("\nChoose text speed:")
-    print("  [1] Slow (0.03)")
-    print("  [2] Fast (0.003)")
-    print("  [3] Instant (0)")
+    @abstractmethod
+    async def flush(self):
+        """Sends what changed on the screen since the last flush."""
+
+    @abstractmethod
+    async def input(self, prompt=""):
+        """Shows `prompt` and returns the player's next line (no newline)."""
+
+    @abstractmethod
+    async def type_text(self, text, delay):
+        """Types `text` out at `delay` seconds per character."""
+
+    async def clear_screen(self):
+        """Starts a fresh view. Costs nothing until the next flush."""
+        self.screen.clear()
+
+    async def sleep(self, seconds):
+        await asyncio.sleep(seconds)
+
+
+def typewriter_pacing(delay):
+    """(chars per frame, seconds per frame) for a per-character delay."""
+    chars_per_frame = max(1, round(1.0 / (TYPEWRITER_FPS * delay)))
+    return chars_per_frame, chars_per_frame * delay
+
+
+@contextmanager
+def key_watch():
+    """
+    Yields wait(timeout): sleeps up to `timeout` seconds and returns True as
+    soon as a key is pressed. The key is swallowed so it doesn't leak into
+    the next prompt. Without a real terminal it just sleeps.
+    """
+    if not sys.stdin.isatty():
+        def wait(timeout):
+            time.sleep(timeout)
+            return False
+        yield wait
+        return
+
+    if os.name == 'nt':
+        import msvcrt
+
+        def wait(timeout):
+            deadline = time.monotonic() + timeout
+            while not msvcrt.kbhit():
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    return False
+                time.sleep(min(left, 0.01))
+            while msvcrt.kbhit():
+                msvcrt.getwch()
+            return True
+        yield wait
+        return
+
+    import termios
+    import tty
+
+    fd = sys.stdin.fileno()
+    old_settings = termios.tcgetattr(fd)
+    try:
+        # cbreak: keys arrive without ENTER and are not echoed
+        tty.setcbreak(fd)
+
+        def wait(timeout):
+            ready, _, _ = select.select([fd], [], [], timeout)
+            if ready:
+                os.read(fd, 1024)
+                return True
+            return False
+        yield wait
+    finally:
+        termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
+
+
+def read_line(loop):
+    """
+    A future for input()'s next line. The read runs on a daemon thread, so
+    Ctrl+C at a prompt ends the game right away instead of waiting for the
+    blocked read to finish (as an executor thread would).
+    """
+    future = loop.create_future()
+
+    def settle(result, error):
+        if not future.done():
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def read():
+        try:
+            result, error = input(), None
+        except (EOFError, OSError) as exc:
+            result, error = None, exc
+        try:
+            loop.call_soon_threadsafe(settle, result, error)
+        except RuntimeError:
+            pass  # the game already ended
+
+    threading.Thread(target=read, name="stdin", daemon=True).start()
+    return future
+
+
+class ConsoleSession(GameSession):
+    """The local player on stdin/stdout."""
+
+    def __init__(self):
+        tty = sys.stdin.isatty() and sys.stdout.isatty()
+        super().__init__(make_screen(tty, os.environ.get("TERM", ""), self.terminal_size()))
+
+    @staticmethod
+    def terminal_size():
+        size = shutil.get_terminal_size()
+        return size.columns, size.lines
+
+    def send(self):
+        sys.stdout.write(self.screen.render())
+        sys.stdout.flush()
+
+    async def flush(self):
+        self.send()
+
+    async def input(self, prompt=""):
+        self.write(prompt)
+        self.send()
+        try:
+            line = await read_line(asyncio.get_running_loop())
+        except (EOFError, OSError):
+            raise SessionClosed("end of input")
+        self.screen.echoed(line + "\n")
+        return line
+
+    async def type_text(self, text, delay):
+        # Only one player here, so blocking in the typewriter is fine
+        chars_per_frame, frame_time = typewriter_pacing(delay)
+
+        with key_watch() as wait:
+            pos = 0
+            next_frame = time.monotonic()
+            while pos < len(text):
+                self.write(text[pos:pos + chars_per_frame])
+                self.send()
+                pos += chars_per_frame
+
+                next_frame += frame_time
+                if pos < len(text) and wait(max(0.0, next_frame - time.monotonic())):
+                    self.write(text[pos:])
+                    break
+
+    async def clear_screen(self):
+        # Pick up a resized window (the next flush then repaints)
+        size = self.terminal_size()
+        if isinstance(self.screen, AnsiScreen) and size != (self.screen.cols, self.screen.rows):
+            self.screen.resize(*size)
+        await super().clear_screen()
+
+
+# Telnet bytes
+IAC, SB, SE, DO = 255, 250, 240, 253
+NAWS = 31   # "negotiate about window size" (RFC 1073)
+
+
+def strip_telnet(data):
+    """Drops telnet IAC negotiation bytes from a line a client sent."""
+    out = bytearray()
+    i = 0
+    while i < len(data):
+        byte = data[i]
+        if byte != IAC:
+            out.append(byte)
+            i += 1
+        elif i + 1 < len(data) and data[i + 1] == IAC:
+            out.append(IAC)
+            i += 2
+        elif i + 1 < len(data) and data[i + 1] == SB:
+            end = data.find(bytes([IAC, SE]), i + 2)
+            i = len(data) if end == -1 else end + 2
+        elif i + 1 < len(data) and 251 <= data[i + 1] <= 254:
+            i += 3
+        else:
+            i += 2
+    return bytes(out)
+
+
+def window_size(data):
+    """The last (cols, rows) a telnet client reported in `data` (IAC SB NAWS ...), or None."""
+    start = data.rfind(bytes([IAC, SB, NAWS]))
+    if start == -1:
+        return None
+    end = data.find(bytes([IAC, SE]), start + 3)
+    if end == -1:
+        return None
+    payload = data[start + 3:end].replace(bytes([IAC, IAC]), bytes([IAC]))
+    if len(payload) != 4:
+        return None
+    cols, rows = payload[0] << 8 | payload[1], payload[2] << 8 | payload[3]
+    if not cols or not rows:
+        return None   # "unknown"
+    return min(cols, MAX_CLIENT_SIZE[0]), min(rows, MAX_CLIENT_SIZE[1])
+
+
+class StreamSession(GameSession):
+    """A player connected over TCP/telnet. Never blocks the event loop."""
+
+    def __init__(self, reader, writer):
+        super().__init__(AnsiScreen(*CLIENT_SIZE))
+        self.reader = reader
+        self.writer = writer
+        self.client_size = CLIENT_SIZE
+        # The read of the client's next line. Only ever one: a second
+        # readline() while one is still waiting raises RuntimeError
+        self.line_read = None
+
+    async def negotiate_size(self):
+        """
+        Asks the client for its window size, so the screen model wraps where
+        the client does. Plain TCP clients (nc) don't answer and keep
+        CLIENT_SIZE; a telnet client also reports later resizes, which take
+        effect at the next clear_screen.
+        """
+        self.writer.write(bytes([IAC, DO, NAWS]))
+        await self.writer.drain()
+        try:
+            reply = await asyncio.wait_for(self.reader.readuntil(bytes([IAC, SE])), NAWS_WAIT)
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            return   # anything the client did send stays in the reader
+        size = window_size(reply)
+        if size:
+            self.client_size = size
+            self.screen.resize(*size)
+
+    async def flush(self):
+        if self.writer.is_closing():
+            raise SessionClosed("disconnected")
+        out = self.screen.render()
+        if out:
+            self.writer.write(out.replace("\n", "\r\n").encode("utf-8"))
+        await self.writer.drain()
+
+    def next_line(self):
+        """The pending read of the client's next line, started if there is none."""
+        if self.line_read is None:
+            self.line_read = asyncio.ensure_future(self.reader.readline())
+        return self.line_read
+
+    async def wait_line(self, timeout):
+        """The next line (see accept_line), or None if none came within `timeout` seconds."""
+        line_read = self.next_line()
+        done, _ = await asyncio.wait({line_read}, timeout=timeout)
+        if not done:
+            return None   # still pending, picked up by the next wait
+        self.line_read = None
+        try:
+            line = line_read.result()
+        except ValueError:
+            raise SessionClosed("line too long")
+        return self.accept_line(line)
+
+    async def read_line(self):
+        """Next line from the client; its local echo is already on their screen."""
+        text = await self.wait_line(IDLE_TIMEOUT)
+        if text is None:
+            raise SessionClosed("idle timeout")
+        return text
+
+    async def close_reads(self):
+        """Stops the pending line read (the session is over)."""
+        if self.line_read is not None:
+            self.line_read.cancel()
+            await asyncio.gather(self.line_read, return_exceptions=True)
+            self.line_read = None
+
+    def accept_line(self, line):
+        if not line:
+            raise SessionClosed("disconnected")
+        size = window_size(line)
+        if size:
+            self.client_size = size
+        text = strip_telnet(line).decode("utf-8", errors="ignore").rstrip("\r\n")
+        self.screen.echoed(text + "\n")
+        return text
+
+    async def input(self, prompt=""):
+        self.write(prompt)
+        await self.flush()
+        return await self.read_line()
+
+    async def type_text(self, text, delay):
+        chars_per_frame, frame_time = typewriter_pacing(delay)
+
+        # Any line the player sends while we type skips to the end. If none
+        # comes, the read stays pending for the next prompt.
+        pos = 0
+        while pos < len(text):
+            self.write(text[pos:pos + chars_per_frame])
+            await self.flush()
+            pos += chars_per_frame
+
+            if pos < len(text) and await self.wait_line(frame_time) is not None:
+                self.write(text[pos:])
+                break
+
+    async def clear_screen(self):
+        # Pick up a size the client reported since (the next flush then repaints)
+        if self.client_size != (self.screen.cols, self.screen.rows):
+            self.screen.resize(*self.client_size)
+        await super().clear_screen()
+
+
+# --- HELPERS ---
+
+async def choose_speed(session):
+    """Ask the user for the text speed every game start."""
+    session.print("\nChoose text speed:")
+    session.print("  [1] Slow (0.03)")
+    session.print("  [2] Fast (0.003)")
+    session.print("  [3] Instant (0)")
 
     while True:
-        choice = input("> ").strip()
+        choice = (await session.input("> ")).strip()
         if choice == "1":
-            TEXT_SPEED = 0.03
+            session.text_speed = 0.03
             break
         elif choice == "2":
-            TEXT_SPEED = 0.003
+            session.text_speed = 0.003
             break
         elif choice == "3":
-            TEXT_SPEED = 0
+            session.text_speed = 0
             break
         else:
-            print("Not understood. Choose 1, 2, or 3.")
+            session.print("Not understood. Choose 1, 2, or 3.")
 
 
-def print_slow(text, delay=None):
-    """Types out text using selected speed unless overridden."""
+async def print_slow(session, text, delay=None):
+    """
+    Types out text using the session's speed unless overridden.
+
+    Text is written in chunks once per frame (TYPEWRITER_FPS) instead of one
+    character per write + flush + sleep. The pace is the same, but there are
+    far fewer writes and wakeups. Any key skips to the end of the text.
+    """
     if delay is None:
-        delay = TEXT_SPEED
+        delay = session.text_speed
 
-    for char in text:
-        sys.stdout.write(char)
-        sys.stdout.flush()
-        time.sleep(delay)
-    print("\n")
+    if delay > 0 and text:
+        await session.type_text(text, delay)
+    else:
+        session.write(text)
+    session.write("\n\n")
+    await session.flush()
 
 
-def pause():
+async def pause(session):
     """Waits for user input to proceed."""
-    print("\n")
-    global DEV_MODE
-    if DEV_MODE:
-        print(">> DEV MODE: Skipping pause...")
-        time.sleep(0.5)
+    session.print("\n")
+    if session.dev_mode:
+        session.print(">> DEV MODE: Skipping pause...")
+        await session.sleep(0.5)
     else:
-        input(">> Press ENTER to continue...")
-    print("\n")
+        await session.input(">> Press ENTER to continue...")
+    session.print("\n")
 
 
-def get_choice(options):
+async def get_choice(session, options):
     """
     Handles user input safely.
     Scrambles the display order so '2' isn't always the answer.
     """
-    global DEV_MODE
-    
     original_keys = list(options.keys())
     winning_key = original_keys[1] if len(original_keys) > 1 else original_keys[0]
 
@@ -82,283 +441,233 @@ def get_choice(options):
     
     ui_map = {}
     
-    print("What will you do?")
+    session.print("What will you do?")
     for index, (orig_key, description) in enumerate(display_items):
         ui_num = str(index + 1)
         ui_map[ui_num] = orig_key
-        print(f"  [{ui_num}] {description}")
+        session.print(f"  [{ui_num}] {description}")
 
-    if DEV_MODE:
+    if session.dev_mode:
         target_ui = next(u for u, k in ui_map.items() if k == winning_key)
-        print(f"\n(DEV MODE: Auto-choosing '{options[winning_key]}')")
-        print(f"> {target_ui}")
-        time.sleep(0.5)
+        session.print(f"\n(DEV MODE: Auto-choosing '{options[winning_key]}')")
+        session.print(f"> {target_ui}")
+        await session.sleep(0.5)
         return winning_key
 
     while True:
-        choice = input("\n> ").strip()
+        choice = (await session.input("\n> ")).strip()
         
         if choice in ui_map:
             return ui_map[choice]
         else:
-            print("I did not understand that. Please type the number of your choice.")
+            session.print("I did not understand that. Please type the number of your choice.")
 
 
 # --- SCENES ---
-
-def start():
-    global inventory
-    inventory = []
-
-    clear_screen()
-    choose_speed()  # <-- NEW: ask speed every game
-
-    print("="*60)
-    print("       T H E   B A L L G A M E   O F   X I B A L B A")
-    print("="*60)
-    print("\n")
-    print_slow("Many years ago, the First Twins played ball too loudly.")
-    print_slow("The Lords of the Underworld (Xibalba) were annoyed.")
-    print_slow("The First Twins failed the tests and were defeated.")
-    print("\n")
-    print_slow("Now, YOU are the New Twins: Hunahpu and Xbalanque.")
-    print_slow("You have accepted the challenge to restore honor to your family.")
+#
+# Every scene returns the next step as (scene_id, reason) instead of calling
+# the next scene itself, and run_game() loops over those steps. Returning None
+# ends the game.
+
+async def start(session, scene, reason=""):
+    session.inventory = []
+
+    await session.clear_screen()
+    await choose_speed(session)  # <-- NEW: ask speed every game
+
+    session.print("="*60)
+    session.print("       T H E   B A L L G A M E   O F   X I B A L B A")
+    session.print("="*60)
+    session.print("\n")
+    for line in scene.text:
+        if line:
+            await print_slow(session, line)
+        else:
+            session.print("\n")
     
-    global DEV_MODE
-    print("\n")
-    initial_input = input(">> Press ENTER to continue: ").strip().lower()
+    session.print("\n")
+    initial_input = (await session.input(">> Press ENTER to continue: ")).strip().lower()
     if initial_input == dev_key:
-        DEV_MODE = True
-        print_slow("\nDEV MODE ACTIVATED! The game will now play itself.")
-        time.sleep(1)
-    print("\n")
+        session.dev_mode = True
+        await print_slow(session, "\nDEV MODE ACTIVATED! The game will now play itself.")
+        await session.sleep(1)
+    session.print("\n")
     
-    crossroads()
-
-
-def crossroads():
-    clear_screen()
-    print("--- THE CROSSROADS ---")
-    print("You descend deep into the earth. You arrive at four paths:")
-    print("Red, White, Yellow, and Black.")
-    print("\nThe Lords are hiding. A mosquito named Xan buzzes near your ear.")
-    print("\n")
-
-    options = {
-        "1": "Walk the Black Path alone",
-        "2": "Send Xan the Mosquito ahead to scout",
-        "3": "Walk the White Path alone",
-        "4": "Walk the Yellow Path alone",
-        "5": "Walk the Red Path alone"
-    }
-    choice = get_choice(options)
-
-    if choice == "1":
-        print_slow("You walk into the dark. The Lords trick you immediately!")
-        game_over_screen("You were lost in the dark.")
-    else:
-        print_slow("Smart choice. Xan flies ahead.")
-        print_slow("Xan bites the wooden dummies. They are silent.")
-        print_slow("Xan bites the REAL Lords. They yell 'Ouch!' revealing their names.")
-        inventory.append("Secret Names")
-        pause()
-        throne_room()
-
-
-def throne_room():
-    clear_screen()
-    print("--- THE GREETING ---")
-    print("You enter the court knowing the Lords' names.")
-    print("They look surprised, but they smile wickedly.")
-    print("\nThey point to a large, beautiful stone bench.")
-    print("'Welcome, Twins! Please, rest on our throne of honor.'")
-    print("\n")
-
-    options = {
-        "1": "Sit on the Throne",
-        "2": "Sit on the Floor"
-    }
-    choice = get_choice(options)
-
-    if choice == "1":
-        print_slow("AAAAH! The stone is boiling hot!")
-        game_over_screen("You were burned and cannot play.")
-    else:
-        print_slow("You politely decline: 'This seat is too good for us.'")
-        print_slow("You sit on the cool floor.")
-        print_slow("The Lords scowl. You have passed the first test.")
-        pause()
-        house_of_gloom()
-
-
-def house_of_gloom():
-    clear_screen()
-    print("--- THE HOUSE OF GLOOM ---")
-    print("The Lords hand you a lit torch and a cigar.")
-    print("'Keep this light burning all night,' they say.")
-    print("'But return it tomorrow UNUSED.'")
-    print("\nIt is a paradox. How do you keep fire without burning the wood?")
-    print("\n")
-
-    options = {
-        "1": "Let the torch burn normally",
-        "2": "Swap the flame for red Macaw feathers"
-    }
-    choice = get_choice(options)
-
-    if choice == "1":
-        print_slow("The torch turns to ash by morning.")
-        game_over_screen("The Lords execute you for failing the task.")
-    else:
-        print_slow("Brilliant!")
-        print_slow("From a distance, the red feathers look like fire.")
-        print_slow("In the morning, you return the torch unburned.")
-        pause()
-        house_of_cold()
-
-
-def house_of_cold():
-    clear_screen()
-    print("--- THE HOUSE OF COLD ---")
-    print("The Lords are frustrated. They shove you into the next room.")
-    print("It is freezing! Thick ice coats the walls and hail falls constantly.")
-    print("You cannot sleep or you will freeze.")
-    print("\n")
-
-    options = {
-        "1": "Huddle together for warmth",
-        "2": "Burn old pinecones found on the floor"
-    }
-    choice = get_choice(options)
-
-    if choice == "1":
-        print_slow("It is not enough. The magical cold freezes you solid.")
-        game_over_screen("You froze in the House of Cold.")
-    else:
-        print_slow("You gather the dry pinecones and light a small fire.")
-        print_slow("The warmth keeps you alive through the freezing night.")
-        print_slow("In the morning, the Lords are shocked to see you healthy.")
-        pause()
-        house_of_jaguars()
-
-
-def house_of_jaguars():
-    clear_screen()
-    print("--- THE HOUSE OF JAGUARS ---")
-    print("The Lords are running out of patience.")
-    print("They throw you into a stone room filled with hungry Jaguars!")
-    print("The beasts roar and circle you, licking their chops.")
-    print("\n")
-
-    options = {
-        "1": "Fight them with your knife",
-        "2": "Throw bones to distract them"
-    }
-    choice = get_choice(options)
-
-    if choice == "1":
-        print_slow("There are too many! You fight bravely, but you are overwhelmed.")
-        game_over_screen("The Jaguars enjoyed their meal.")
-    else:
-        print_slow("You throw the dry bones into the corners of the room.")
-        print_slow("The Jaguars chase the bones and gnaw on them happily.")
-        print_slow("They wrestle over the bones and ignore you all night.")
-        pause()
-        ballgame()
+    return (scene.choices[0].next, "")
+
+
+async def choice_scene(session, scene, reason=""):
+    """Shows a story scene from the graph and returns where the choice leads."""
+    await session.clear_screen()
+    session.print(f"--- {scene.banner} ---")
+    for line in scene.text:
+        session.print(line)
+    session.print("\n")
 
+    choice = await get_choice(session, scene.options)
+    return await follow(session, GRAPH.transition(scene.id, choice))
 
-def ballgame():
-    clear_screen()
-    print("--- THE TLACHTLI COURT ---")
-    print("You have survived all the Houses. Now, the sport begins.")
-    print("The heavy rubber ball bounces on the stone court.")
-    print("The Lords serve the ball to you.")
-    print("\n")
+
+async def follow(session, transition):
+    """Prints a choice's outcome and returns the step it leads to."""
+    for line in transition.outcome:
+        await print_slow(session, line)
+    if transition.gain:
+        session.inventory.append(transition.gain)
+
+    if transition.next != "game_over" and transition.outcome:
+        await pause(session)
+    return (transition.next, transition.reason)
+
+
+async def ballgame(session, scene, reason=""):
+    await session.clear_screen()
+    session.print(f"--- {scene.banner} ---")
+    for line in scene.text:
+        session.print(line)
+    session.print("\n")
 
     score = 0
     rounds = 0
     
-    while rounds < 3:
-        print(f"ROUND {rounds + 1} | SCORE: {score}")
-        options = {
-            "1": "High Lob",
-            "2": "Hip Strike (Solid)",
-            "3": "Low Slide"
-        }
-        choice = get_choice(options)
-
-        if choice == "2":
-            print("\n>> SMACK! A perfect hit off the hip. You score!\n")
+    while rounds < scene.rounds:
+        session.print(f"ROUND {rounds + 1} | SCORE: {score}")
+        shot = scene.shot_for_key[await get_choice(session, scene.shot_options)]
+        session.print(f"\n{shot.text}\n")
+        if shot.scores:
             score += 1
-        elif choice == "1":
-            print("\n>> Too high! The Lords smash it back easily.\n")
-        else:
-            print("\n>> Too low! You scrape your knee on the stone.\n")
         
         rounds += 1
-        time.sleep(1)
-
-    if score >= 1:
-        print_slow("The Lords are furious that you are winning.")
-        print_slow("They cheat and throw the ball into the House of Fire.")
-        pause()
-        finale()
-    else:
-        game_over_screen("The Lords defeated you in the game.")
-
-
-def finale():
-    clear_screen()
-    print("--- THE GRAND TRICK ---")
-    print("The Twins realize they cannot win by normal rules.")
-    print("You allow yourselves to be burned, but then you return!")
-    print("\nYou perform miracles, bringing things back to life.")
-    print("The Lords are amazed. 'Burn us!' they command. 'Make us young again!'")
-    print("\n")
-
-    options = {
-        "1": "Burn them and REVIVE them",
-        "2": "Burn them and DO NOT revive them"
-    }
-    choice = get_choice(options)
-
-    if choice == "1":
-        print_slow("You revive the evil Lords. They thank you... by eating you.")
-        game_over_screen("You were too merciful.")
-    else:
-        victory()
-
-
-def victory():
-    clear_screen()
-    print("\n" + "*"*60)
-    print("                   V I C T O R Y !")
-    print("*"*60 + "\n")
-    print_slow("The Lords turn to ash and blow away in the wind.")
-    print_slow("Xibalba is defeated.")
-    print_slow("Hunahpu and Xbalanque rise into the sky.")
-    print("\nThey become the SUN and the MOON.")
-    print("\nCongratulations! You have completed the story.")
-    input("\nPress Enter to exit.")
-    sys.exit()
-
-
-def game_over_screen(reason):
-    print("\n" + "-"*40)
-    print("G A M E   O V E R")
-    print(f"Reason: {reason}")
-    print("-"*40 + "\n")
+        await session.sleep(1)
+
+    result = "win" if score >= scene.min_score else "lose"
+    return await follow(session, GRAPH.transition(scene.id, result))
+
+
+async def victory(session, scene, reason=""):
+    await session.clear_screen()
+    session.print("\n" + "*"*60)
+    session.print("                   V I C T O R Y !")
+    session.print("*"*60 + "\n")
+    for line in scene.text:
+        await print_slow(session, line)
+    session.print("\nThey become the SUN and the MOON.")
+    session.print("\nCongratulations! You have completed the story.")
+    await session.input("\nPress Enter to exit.")
+    return None
+
+
+async def game_over_screen(session, scene, reason=""):
+    session.print("\n" + "-"*40)
+    session.print("G A M E   O V E R")
+    session.print(f"Reason: {reason}")
+    session.print("-"*40 + "\n")
     
-    options = {"1": "Try Again", "2": "Quit"}
-    choice = get_choice(options)
+    choice = await get_choice(session, scene.options)
+    transition = GRAPH.transition(scene.id, choice)
     
-    if choice == "1":
-        choose_speed()  # <-- ASK SPEED AGAIN ON RESTART
-        start()
-    else:
-        print("Goodbye.")
-        sys.exit()
+    if transition.next is None:
+        session.print("Goodbye.")
+        return None
+    # start() asks for the text speed again
+    return (transition.next, "")
+
+
+# Scene kind -> coroutine that plays it
+SCENE_HANDLERS = {
+    "intro": start,
+    "choice": choice_scene,
+    "ballgame": ballgame,
+    "ending": victory,
+    "game_over": game_over_screen,
+}
+
+
+async def run_game(session):
+    """
+    Plays scenes until one returns None. The stack depth stays the same no
+    matter how many scenes or retries a session goes through.
+    """
+    step = (GRAPH.start_scene, "")
+    while step is not None:
+        scene_id, reason = step
+        scene = GRAPH[scene_id]
+        step = await SCENE_HANDLERS[scene.kind](session, scene, reason)
+    await session.flush()
+
+
+# --- SERVER MODE ---
+
+async def close_connection(writer):
+    """Closes a client's connection and waits until it's gone."""
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except ConnectionError:
+        pass
+
+
+async def serve(host, port):
+    """
+    Hosts the game over plain TCP (telnet/nc). Every connection gets its own
+    GameSession running as a coroutine in this one process.
+    """
+    active = set()
+
+    async def handle(reader, writer):
+        if len(active) >= MAX_SESSIONS:
+            writer.write(b"The court is full. Try again later.\r\n")
+            try:
+                await writer.drain()
+            except ConnectionError:
+                pass
+            await close_connection(writer)
+            return
+
+        session = StreamSession(reader, writer)
+        task = asyncio.current_task()
+        active.add(task)
+        try:
+            await session.negotiate_size()
+            await asyncio.wait_for(run_game(session), SESSION_TIMEOUT)
+        except (SessionClosed, asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            active.discard(task)
+            await session.close_reads()
+            if not writer.is_closing():
+                writer.write(session.screen.restore().encode("ascii"))
+            await close_connection(writer)
+
+    server = await asyncio.start_server(handle, host, port)
+    where = ", ".join(str(sock.getsockname()) for sock in server.sockets)
+    print(f"Serving The Ballgame of Xibalba on {where} (telnet/nc to play)")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="The Ballgame of Xibalba (terminal version)")
+    parser.add_argument("--serve", action="store_true",
+                        help="host the game over TCP so many players can connect")
+    parser.add_argument("--host", default="0.0.0.0", help="address to listen on with --serve")
+    parser.add_argument("--port", type=int, default=SERVER_PORT, help="port to listen on with --serve")
+    args = parser.parse_args()
+
+    try:
+        if args.serve:
+            asyncio.run(serve(args.host, args.port))
+        else:
+            session = ConsoleSession()
+            try:
+                asyncio.run(run_game(session))
+            finally:
+                sys.stdout.write(session.screen.restore())
+                sys.stdout.flush()
+    except (SessionClosed, KeyboardInterrupt):
+        pass
 
 
 # Start the whole thing
-start()
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Signed win codes for the ball court.
+
+The old codes (TLACHTLI-P1-<time>-<random>) were made up by the browser and
+the server only checked the prefix, so anyone could type one in. Now:
+
+  1. The server gives each session a random nonce, and the game page a key
+     derived from it: key = HMAC(server secret, nonce). The secret itself
+     never leaves the server.
+  2. When the player wins, the game signs the result with that key:
+         TLACHTLI-P1-<nonce>-<first 16 hex of HMAC(key, "TLACHTLI-P1-<nonce>")>
+  3. st1.py recomputes the signature (two HMACs, no storage lookups) and
+     compares it in constant time. The nonce must be the one issued to this
+     session, and each nonce can only be redeemed once; used nonces are kept
+     until they expire, in memory or (st1.py) in the session store, so
+     every server process sharing the store knows about them.
+
+So a code only works in the session it was made for, once, and can't be
+guessed or copied from a friend. The key is in the page, so someone reading
+the game's JavaScript could still sign their own win; this is meant to stop
+casual cheating, not to be DRM.
+
+Set XIBALBA_WIN_SECRET to keep codes valid across server restarts; otherwise
+a random secret is made per process. Any setup where a session can come back
+to a different process (a shared session store, several replicas) needs it.
+"""
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from collections import deque
+
+PREFIX = "TLACHTLI"
+SIDES = ("P1", "P2")        # P1 = the player (left paddle), P2 = the Lords
+NONCE_BYTES = 6             # 12 hex chars
+TAG_CHARS = 16              # hex chars of the signature kept in the code
+USED_TTL = 24 * 60 * 60     # seconds a redeemed nonce is remembered
+MAX_USED = 100_000
+SECRET_ENV = "XIBALBA_WIN_SECRET"
+
+# verify() results
+VALID = "valid"
+INVALID = "invalid"
+WRONG_SESSION = "wrong_session"
+ALREADY_USED = "already_used"
+
+
+class UsedNonces:
+    """Nonces that were already redeemed, forgotten after `ttl` seconds."""
+
+    def __init__(self, ttl=USED_TTL, max_entries=MAX_USED, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self.expires = {}        # nonce -> expiry time
+        self.order = deque()     # (expiry, nonce), oldest first (the TTL is fixed)
+        self.lock = threading.Lock()
+
+    def _evict(self, now):
+        while self.order and (self.order[0][0] <= now or len(self.order) > self.max_entries):
+            expiry, nonce = self.order.popleft()
+            if self.expires.get(nonce) == expiry:
+                del self.expires[nonce]
+
+    def claim_nonce(self, nonce):
+        """Marks `nonce` used. Returns False if it already was."""
+        now = self.clock()
+        with self.lock:
+            self._evict(now)
+            if nonce in self.expires:
+                return False
+            expiry = now + self.ttl
+            self.expires[nonce] = expiry
+            self.order.append((expiry, nonce))
+            return True
+
+    def __len__(self):
+        return len(self.expires)
+
+
+class WinCodes:
+    """
+    Issues session nonces and keys, and checks the codes signed with them.
+    `used` is anything with claim_nonce(nonce) -> bool: UsedNonces (this
+    process only) by default, or a session store (see session_store.py).
+    """
+
+    def __init__(self, secret=None, used=None):
+        if secret is None:
+            env = os.environ.get(SECRET_ENV)
+            secret = env.encode("utf-8") if env else secrets.token_bytes(32)
+        self.secret = secret
+        self.used = used if used is not None else UsedNonces()
+
+    def new_nonce(self):
+        return secrets.token_hex(NONCE_BYTES).upper()
+
+    def session_key(self, nonce):
+        """The signing key handed to the game page for `nonce` (hex)."""
+        return hmac.new(self.secret, b"win-key|" + nonce.encode("ascii"), hashlib.sha256).hexdigest()
+
+    def sign(self, nonce, side="P1"):
+        """The code the game shows for a `side` win. Same computation as game.html."""
+        message = f"{PREFIX}-{side}-{nonce}"
+        key = bytes.fromhex(self.session_key(nonce))
+        tag = hmac.new(key, message.encode("ascii"), hashlib.sha256).hexdigest()[:TAG_CHARS].upper()
+        return f"{message}-{tag}"
+
+    def verify(self, code, nonce):
+        """
+        Checks a typed-in code against this session's `nonce`.
+        Returns (result, side): result is VALID, INVALID, WRONG_SESSION or
+        ALREADY_USED; side is "P1" / "P2" for valid codes, else None.
+        A valid code uses up the nonce.
+        """
+        parts = code.strip().upper().split("-")
+        if len(parts) != 4 or parts[0] != PREFIX or parts[1] not in SIDES:
+            return INVALID, None
+        _, side, code_nonce, tag = parts
+        if len(code_nonce) != NONCE_BYTES * 2 or len(tag) != TAG_CHARS:
+            return INVALID, None
+
+        expected = self.sign(code_nonce, side).rsplit("-", 1)[1]
+        if not hmac.compare_digest(expected, tag):
+            return INVALID, None
+        if not nonce or not hmac.compare_digest(code_nonce, nonce):
+            return WRONG_SESSION, None
+        if not self.used.claim_nonce(code_nonce):
+            return ALREADY_USED, None
+        return VALID, side